@@ -0,0 +1,234 @@
+"""Benchmarks of the hot paths: clue decoding, routing, proof of work and map loading.
+
+Inputs are fixed (clue.ls8, world.pickle, seeded room pairs, a fixed run of last proofs), so results only move when
+the code or the machine does.
+
+    $ python benchmarks.py           # Write benchmark_results.json and compare it to benchmark_baseline.json.
+    $ python benchmarks.py baseline  # Save the results of three times the repeats as the new baseline.
+
+Comparing exits with status 1 if any metric is worse than the baseline by more than its threshold. Metrics ending in
+_per_second are better higher, all others are better lower. Everything is timed in CPU time of this process, so time
+other processes get on a shared CPU isn't counted. Every run also times a fixed calibration loop, and rates and times
+are scaled by it before comparing, so a slower machine doesn't read as a regression.
+
+The committed baseline was saved on a single CPU x86_64 Linux container running Python 3.11.7, shared with other
+work. There, runs of an unchanged tree differ from each other by up to about 25%, and 35% while the host is busy. The
+thresholds cover that. On a quieter machine, save a baseline of your own and tighten them.
+"""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+RESULTS = 'benchmark_results.json'
+BASELINE = 'benchmark_baseline.json'
+# Allowed slowdown or growth, as a fraction of the baseline, by metric suffix.
+THRESHOLDS = {'_per_second': .4, '_ms': .5, '_kb': .1, '_mb': .2}
+# Runs of each benchmark. The median of each metric counts.
+REPEATS = 5
+ROUTE_PAIRS = 200
+ROUTE_SEED = 0
+# Loads of the map timed per run of bench_map. The median counts.
+MAP_LOADS = 9
+# {difficulty: number of proofs to find}, enough for about a second of hashing each.
+PROOFS = {3: 100, 4: 8, 5: 2}
+FIRST_PROOF = 1234
+
+
+def rss_mb() -> float:
+    """Resident memory of this process."""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (FileNotFoundError, ValueError):
+        import resource
+        # Peak rather than current memory where /proc isn't available.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 10
+
+
+def player():
+    """A quiet GamePlayer that never touches the network."""
+    from events import ERROR
+    from play_it import GamePlayer
+    game = GamePlayer(session=None)
+    game.log.level = ERROR
+    return game
+
+
+def bench_map() -> dict:
+    game = player()
+    times = []
+    for _ in range(MAP_LOADS):
+        game.world = {}
+        start = time.process_time()
+        game.load_map()
+        times.append((time.process_time() - start) * 1000)
+    # Memory freed by an earlier load gets reused, so the process's RSS barely moves on repeat loads. The heap
+    # a load allocates doesn't depend on what ran before.
+    rss = rss_mb()
+    game.world = {}
+    tracemalloc.start()
+    game.load_map()
+    world_kb = tracemalloc.get_traced_memory()[0] / 1024
+    tracemalloc.stop()
+    return {'map.load_ms': statistics.median(times),
+            'map.world_kb': world_kb,
+            'map.rss_mb': rss}
+
+
+def bench_cpu(runs: int = 200) -> dict:
+    from cpu import CPU, VirtualClock
+    from ls8 import read_program
+    program = read_program('clue.ls8')
+    cpu = CPU(clock=VirtualClock())
+    instructions = 0
+    start = time.process_time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(runs):
+            cpu.reset(program)
+            cpu.run()
+            instructions += cpu.clock.count
+    return {'cpu.instructions_per_second': instructions / (time.process_time() - start)}
+
+
+def bench_route() -> dict:
+    game = player()
+    game.load_map()
+    rng = random.Random(ROUTE_SEED)
+    rooms = sorted(game.world)
+    pairs = [(rng.choice(rooms), rng.choice(rooms)) for _ in range(ROUTE_PAIRS)]
+    times = []
+    for start, target in pairs:
+        begin = time.process_time()
+        game.find_path(target, start=start)
+        times.append((time.process_time() - begin) * 1000)
+    # The map is complete, so BFS_UE searches every room before giving up.
+    bfs_times = []
+    for start, _ in pairs[:20]:
+        game.current_room = start
+        begin = time.process_time()
+        game.BFS_UE()
+        bfs_times.append((time.process_time() - begin) * 1000)
+    tracemalloc.start()
+    for start, target in pairs:
+        game.find_path(target, start=start)
+    held, find_path_peak = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    game.BFS_UE()
+    # Only count what BFS_UE allocates, not what routing still holds.
+    bfs_peak = tracemalloc.get_traced_memory()[1] - held
+    tracemalloc.stop()
+    return {'route.find_path_p50_ms': statistics.median(times),
+            'route.find_path_p95_ms': statistics.quantiles(times, n=20)[-1],
+            'route.find_path_peak_kb': find_path_peak / 1024,
+            'route.bfs_ue_mean_ms': statistics.mean(bfs_times),
+            'route.bfs_ue_peak_kb': bfs_peak / 1024}
+
+
+def bench_proof() -> dict:
+    game = player()
+    results = {}
+    for difficulty, proofs in PROOFS.items():
+        hashes = 0
+        start = time.process_time()
+        for last_proof in range(FIRST_PROOF, FIRST_PROOF + proofs):
+            # The search starts at 0, so finding proof x took x + 1 hashes.
+            hashes += game.find_proof(last_proof, difficulty) + 1
+        results[f'proof.d{difficulty}_hashes_per_second'] = hashes / (time.process_time() - start)
+    return results
+
+
+BENCHMARKS = (bench_map, bench_cpu, bench_route, bench_proof)
+
+
+def calibrate(loops: int = 200000) -> float:
+    """Loops per second of a fixed mix of hashing, dict and list work, to gauge how fast this machine is now."""
+    from hashlib import sha256
+    start = time.process_time()
+    table, queue = {}, []
+    for i in range(loops):
+        table[i & 1023] = sha256(str(i).encode()).digest()
+        queue.append(i)
+        if len(queue) > 64:
+            queue.pop(0)
+    return loops / (time.process_time() - start)
+
+
+def scale(name: str, value: float, speed: float) -> float:
+    """<value> of metric <name> as if measured on a machine <speed> times as fast."""
+    if name.endswith('_per_second'):
+        return value * speed
+    if name.endswith('_ms'):
+        return value / speed
+    return value
+
+
+def run(repeats: int = REPEATS) -> dict:
+    """Run every benchmark <repeats> times, keeping the median of each metric, and of the calibrations taken before
+    each, to shrug off noise.
+    """
+    speeds, values = [], {}
+    for benchmark in BENCHMARKS:
+        for _ in range(repeats):
+            speeds.append(calibrate())
+            for name, value in benchmark().items():
+                values.setdefault(name, []).append(value)
+    return {'python': platform.python_version(),
+            'machine': platform.machine(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'calibration': statistics.median(speeds),
+            'metrics': {name: statistics.median(measured) for name, measured in values.items()}}
+
+
+def compare(results: dict, baseline: dict) -> list:
+    """Return a line for every metric of <results> worse than <baseline> by more than its threshold.
+
+    Rates and times are first scaled by how much faster this machine calibrated than the baseline's did.
+    """
+    regressions = []
+    speed = results['calibration'] / baseline['calibration']
+    for name, value in results['metrics'].items():
+        base = baseline['metrics'].get(name)
+        if not base:
+            continue
+        threshold = next(limit for suffix, limit in THRESHOLDS.items() if name.endswith(suffix))
+        base = scale(name, base, speed)
+        if name.endswith('_per_second'):
+            change = (base - value) / base
+        else:
+            change = (value - base) / base
+        if change > threshold:
+            regressions.append(f'{name}: {value:.4g} vs {base:.4g} baseline, {change:.0%} worse')
+    return regressions
+
+
+if __name__ == '__main__':
+    # Everything later runs compare to should sit near the middle of their spread, so the baseline takes more repeats.
+    results = run(REPEATS * 3 if sys.argv[1:] == ['baseline'] else REPEATS)
+    for name, value in results['metrics'].items():
+        print(f'{name:<36} {value:>14.4g}')
+    if sys.argv[1:] == ['baseline']:
+        with open(BASELINE, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'Saved {BASELINE}')
+        sys.exit()
+    with open(RESULTS, 'w') as f:
+        json.dump(results, f, indent=2)
+    try:
+        with open(BASELINE) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f'No {BASELINE} to compare against. Save one with: python benchmarks.py baseline')
+        sys.exit()
+    regressions = compare(results, baseline)
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,35 @@
+import os
+import shutil
+
+import pytest
+
+from local_server import serve
+from play_it import GamePlayer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture
+def world_dir(tmp_path, monkeypatch):
+    """Run in a scratch directory holding a copy of world.pickle, so games don't overwrite clue.ls8 or sessions."""
+    shutil.copy(os.path.join(HERE, 'world.pickle'), tmp_path)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def server(world_dir):
+    """A local game server with cooldowns compressed 2000 times."""
+    server = serve(seed=1, compression=2000)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def player_at(server, room: int) -> GamePlayer:
+    """A player of <server> standing in <room>, with the map loaded."""
+    game = GamePlayer(url=server.url, session=None)
+    game.cooldown_margin /= server.game.compression
+    game.load_map()
+    server.game.player(game.key).room = game.current_room = room
+    return game
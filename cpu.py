@@ -2,35 +2,102 @@
 
 import sys
 import os
-from datetime import datetime
+import time
+from collections import Counter, deque, namedtuple
+from contextlib import contextmanager
 import select
 import tty
 import termios
 
 
 class NonBlockingConsole(object):
+    """Read single keys from stdin without blocking. Reads nothing when stdin isn't a terminal."""
 
     def __enter__(self):
-        self.old_settings = termios.tcgetattr(sys.stdin)
-        tty.setcbreak(sys.stdin.fileno())
+        self.interactive = sys.stdin.isatty()
+        if self.interactive:
+            self.old_settings = termios.tcgetattr(sys.stdin)
+            tty.setcbreak(sys.stdin.fileno())
         return self
 
     def __exit__(self, type, value, traceback):
-        termios.tcsetattr(sys.stdin, termios.TCSADRAIN, self.old_settings)
+        if self.interactive:
+            termios.tcsetattr(sys.stdin, termios.TCSADRAIN, self.old_settings)
 
     def get_data(self):
+        if not self.interactive:
+            return False
         if select.select([sys.stdin], [], [], 0) == ([sys.stdin], [], []):
             return sys.stdin.read(1)
         return False
 
 
+class RealClock:
+    """Fire the timer interrupt once every second of wall-clock time."""
+
+    def __init__(self, seconds: float = 1.0):
+        self.seconds = seconds
+        self.reset()
+
+    def reset(self):
+        self.then = time.monotonic()
+
+    def snapshot(self):
+        return self.then
+
+    def restore(self, then: float):
+        self.then = then
+
+    def tick(self) -> bool:
+        """Called once per instruction cycle. Return True when the timer fires."""
+        now = time.monotonic()
+        if now - self.then >= self.seconds:
+            self.then = now
+            return True
+        return False
+
+
+class VirtualClock:
+    """Fire the timer interrupt every <cycles> instruction cycles, for fast, reproducible headless runs."""
+
+    def __init__(self, cycles: int = 1000):
+        self.cycles = cycles
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+
+    def snapshot(self):
+        return self.count
+
+    def restore(self, count: int):
+        self.count = count
+
+    def tick(self) -> bool:
+        self.count += 1
+        return self.count % self.cycles == 0
+
+
+# Operand bytes taken by each instruction.
+OPERANDS = {'ADD': 2, 'AND': 2, 'CMP': 2, 'DEC': 1, 'DIV': 2, 'INC': 1, 'MOD': 2, 'MUL': 2, 'NOT': 1,
+            'OR': 2, 'SHL': 2, 'SHR': 2, 'SUB': 2, 'XOR': 2,
+            'CALL': 1, 'INT': 1, 'IRET': 0, 'JEQ': 1, 'JGE': 1, 'JGT': 1, 'JLE': 1, 'JLT': 1, 'JMP': 1,
+            'JNE': 1, 'RET': 0,
+            'HLT': 0, 'LD': 2, 'LDI': 2, 'NOP': 0, 'POP': 1, 'PRA': 1, 'PRN': 1, 'PUSH': 1, 'ST': 2}
+# Immutable copy of everything a running program can change. clock is the clock's own snapshot, or None to leave
+# the clock as it is.
+Snapshot = namedtuple('Snapshot', ['ram', 'reg', 'pc', 'fl', 'interrupts', 'halted', 'heap_height', 'next_room',
+                                   'clock'])
+
+
 class CPU:
     """Main CPU class."""
 
-    def __init__(self):
-        """Construct a new CPU."""
+    def __init__(self, clock=None):
+        """Construct a new CPU. The timer interrupt follows <clock>, real time by default."""
+        self.clock = clock or RealClock()
         self.ram = [0] * 256
-        self.reg = [f'{0:08b}'] * 8
+        self.reg = [0] * 8
         self.IS = 6
         self.IM = 5
         self.SP = 7
@@ -42,7 +109,9 @@ class CPU:
         self.arg_1 = 0xff
         self.arg_2 = 0xfe
         self.interrupts = True
+        self.halted = False
         self.next_room = ''
+        self.profiler = None
         # Map functions. {is_alu_function: {sets_pc: {function_code: function}}}
         self.op_map = {1: {0: {0b0000: self.ADD,
                                0b1000: self.AND,
@@ -85,21 +154,60 @@ class CPU:
                            }
                        }
 
-    def load(self):
-        """Load a program into memory."""
-        args = sys.argv[1:]
-        if args:
-            file = os.path.join(args[0])
-        else:
-            file = 'clue.ls8'
+    def snapshot(self) -> Snapshot:
+        """Capture ram, registers, pc, fl, interrupt and clock state."""
+        return Snapshot(bytes(self.ram), bytes(self.reg), self.pc, self.fl, self.interrupts, self.halted,
+                        self.heap_height, self.next_room, self.clock.snapshot())
+
+    def restore(self, snapshot: Snapshot):
+        """Put the CPU back in the state of <snapshot>. Many CPUs can resume from the same snapshot."""
+        self.ram[:] = snapshot.ram
+        self.reg[:] = snapshot.reg
+        self.pc = snapshot.pc
+        self.fl = snapshot.fl
+        self.interrupts = snapshot.interrupts
+        self.halted = snapshot.halted
+        self.heap_height = snapshot.heap_height
+        self.next_room = snapshot.next_room
+        if snapshot.clock is not None:
+            self.clock.restore(snapshot.clock)
+
+    def reset(self, program: bytes = b''):
+        """Return to power-on state, then load <program>. Cheaper than building a new CPU."""
+        self.restore(POWER_ON)
+        self.clock.reset()
+        self.load_image(program)
+
+    def load(self, file: str = None):
+        """Load a program into memory.
+
+        Text programs hold one binary byte per line, binary .ls8b images are copied straight into ram.
+        """
+        if file is None:
+            args = sys.argv[1:]
+            if args:
+                file = os.path.join(args[0])
+            else:
+                file = 'clue.ls8'
+        if file.endswith('.ls8b'):
+            from ls8 import read_image
+            self.load_image(read_image(file))
+            return
         with open(file, 'r') as f:
             for line in f:
                 line = line.split('#')[0].strip()
                 if line == '':
                     continue
-                self.ram[self.heap_height] = f'{int(line, 2):08b}'
+                self.ram[self.heap_height] = int(line, 2)
                 self.heap_height += 1
 
+    def load_image(self, image: bytes):
+        """Copy a program <image> of raw bytes into memory."""
+        if len(image) > len(self.ram):
+            raise ValueError(f'A {len(image)} byte program does not fit in {len(self.ram)} bytes of memory')
+        self.ram[:len(image)] = image
+        self.heap_height = len(image)
+
     def first(self):
         """Get the value for the first active register."""
         return self.ram_read(self.arg_1)
@@ -110,14 +218,13 @@ class CPU:
 
     def PRN(self):
         """Print a number."""
-        number = self.reg[int(self.first(), 2)]
-        print(int(number, 2), end='', flush=True)
+        number = str(self.reg[self.first()])
+        print(number, end='', flush=True)
         return number
 
     def PRA(self):
         """Print a character."""
-        address = self.reg[int(self.first(), 2)]
-        character = chr(int(address, 2))
+        character = chr(self.reg[self.first()])
         print(f'{character}', end='', flush=True)
         return character
 
@@ -125,40 +232,40 @@ class CPU:
         """Load immediate.
 
         Set a register value."""
-        self.reg[int(self.first(), 2)] = self.second()
+        self.reg[self.first()] = self.second()
 
     def HLT(self):
         """Halt program."""
-        pass
+        self.halted = True
 
     def LD(self):
         """Load the value in memory at address in arg_2 into register in arg_1"""
-        self.reg[int(self.first(), 2)] = self.ram[int(self.reg[int(self.second(), 2)], 2)]
+        self.reg[self.first()] = self.ram[self.reg[self.second()]]
 
     def PUSH(self):
         """Move pointer to next stack position and set value."""
-        self.reg[self.SP] -= 1
-        self.ram[self.reg[self.SP]] = self.reg[int(self.first(), 2)]
+        self.reg[self.SP] = (self.reg[self.SP] - 1) & 0xff
+        self.ram[self.reg[self.SP]] = self.reg[self.first()]
 
     def POP(self):
         """Get value from top of stack and move pointer."""
-        self.reg[int(self.first(), 2)] = self.ram[self.reg[self.SP]]
-        self.reg[self.SP] += 1
+        self.reg[self.first()] = self.ram[self.reg[self.SP]]
+        self.reg[self.SP] = (self.reg[self.SP] + 1) & 0xff
 
     def CALL(self):
         """Store location of pc before jumping to given address."""
-        self.reg[self.SP] -= 1
-        self.ram[self.reg[self.SP]] = self.pc + 1
-        self.pc = int(self.reg[int(self.first(), 2)], 2)
+        self.reg[self.SP] = (self.reg[self.SP] - 1) & 0xff
+        self.ram[self.reg[self.SP]] = (self.pc + 1) & 0xff
+        self.pc = self.reg[self.first()]
 
     def RET(self):
         """Return from CALL."""
         self.pc = self.ram[self.reg[self.SP]]
-        self.reg[self.SP] += 1
+        self.reg[self.SP] = (self.reg[self.SP] + 1) & 0xff
 
     def ST(self):
         """Store value of second register in memory at adress stored in first."""
-        self.ram[int(self.reg[int(self.first(), 2)], 2)] = self.reg[int(self.second(), 2)]
+        self.ram[self.reg[self.first()]] = self.reg[self.second()]
 
     def INT(self):
         """Interrupt program and jump to interrupt handler.
@@ -168,20 +275,20 @@ class CPU:
         Store all but 8th register in stack, followed by fl and current pc.
         Move pc to interrupt handler address.
         """
-        interrupt = int(self.first(), 2)
+        interrupt = self.first()
         # Clear the bit of interrupt being handled while preserving other
-        # potentially set interrupts.
-        self.reg[self.IS] = f'{int(self.reg[self.IS], 2) & 7 - ((0xff - interrupt) + 1):08b}'
+        # potentially set interrupts. Vectors start at 0xf8.
+        self.reg[self.IS] &= ~(1 << (interrupt - 0xf8)) & 0xff
         self.interrupts = False
-        self.reg[self.SP] -= 1
+        self.reg[self.SP] = (self.reg[self.SP] - 1) & 0xff
         self.ram[self.reg[self.SP]] = self.pc
-        self.reg[self.SP] -= 1
+        self.reg[self.SP] = (self.reg[self.SP] - 1) & 0xff
         self.ram[self.reg[self.SP]] = self.fl
         for i in range(7):
-            self.reg[self.SP] -= 1
+            self.reg[self.SP] = (self.reg[self.SP] - 1) & 0xff
             self.ram[self.reg[self.SP]] = self.reg[i]
-            self.reg[i] = '00000000'
-        self.pc = int(self.ram[interrupt], 2)
+            self.reg[i] = 0
+        self.pc = self.ram[interrupt]
 
     def IRET(self):
         """Return from interrupt.
@@ -190,11 +297,11 @@ class CPU:
         """
         for i in range(6, -1, -1):
             self.reg[i] = self.ram[self.reg[self.SP]]
-            self.reg[self.SP] += 1
+            self.reg[self.SP] = (self.reg[self.SP] + 1) & 0xff
         self.fl = self.ram[self.reg[self.SP]]
-        self.reg[self.SP] += 1
+        self.reg[self.SP] = (self.reg[self.SP] + 1) & 0xff
         self.pc = self.ram[self.reg[self.SP]]
-        self.reg[self.SP] += 1
+        self.reg[self.SP] = (self.reg[self.SP] + 1) & 0xff
         self.interrupts = True
 
     def NOP(self):
@@ -203,109 +310,96 @@ class CPU:
 
     def JMP(self):
         """Jump."""
-        self.pc = int(self.reg[int(self.first(), 2)], 2)
+        self.pc = self.reg[self.first()]
 
     def JEQ(self):
         """Jump if equal flag set."""
         if self.fl & 1:
-            self.pc = int(self.reg[int(self.first(), 2)], 2)
+            self.pc = self.reg[self.first()]
         else:
             self.pc += 1
 
     def JNE(self):
         """Jump if equal flag not set."""
         if not self.fl & 1:
-            self.pc = int(self.reg[int(self.first(), 2)], 2)
+            self.pc = self.reg[self.first()]
         else:
             self.pc += 1
 
     def JGT(self):
         """Jump if greater flag set."""
         if self.fl & (1 << 1):
-            self.pc = int(self.reg[int(self.first(), 2)], 2)
+            self.pc = self.reg[self.first()]
         else:
             self.pc += 1
 
     def JGE(self):
         """Jump if greater or equal flags set."""
         if self.fl & 1 or self.fl & (1 << 1):
-            self.pc = int(self.reg[int(self.first(), 2)], 2)
+            self.pc = self.reg[self.first()]
         else:
             self.pc += 1
 
     def JLT(self):
         """Jump if less flag set."""
         if self.fl & (1 << 2):
-            self.pc = int(self.reg[int(self.first(), 2)], 2)
+            self.pc = self.reg[self.first()]
         else:
             self.pc += 1
 
     def JLE(self):
         """Jump if less or equal flags set."""
         if self.fl & 1 or self.fl & (1 << 2):
-            self.pc = int(self.reg[int(self.first(), 2)], 2)
+            self.pc = self.reg[self.first()]
         else:
             self.pc += 1
 
     def DEC(self):
         """Decrement"""
-        deced = (int(self.reg[int(self.first(), 2)], 2) - 1) & 0xff
-        self.reg[int(self.first(), 2)] = f'{deced:08b}'
+        self.reg[self.first()] = (self.reg[self.first()] - 1) & 0xff
 
     def INC(self):
         """Increment."""
-        inced = (int(self.reg[int(self.first(), 2)], 2) + 1) & 0xff
-        self.reg[int(self.first(), 2)] = f'{inced:08b}'
+        self.reg[self.first()] = (self.reg[self.first()] + 1) & 0xff
 
     def ADD(self):
-        added = (int(self.reg[int(self.first(), 2)], 2) + int(self.reg[int(self.second(), 2)], 2)) & 0xff
-        self.reg[int(self.first(), 2)] = f'{added:08b}'
+        self.reg[self.first()] = (self.reg[self.first()] + self.reg[self.second()]) & 0xff
 
     def SUB(self):
         """Subtract."""
-        subbed = (int(self.reg[int(self.first(), 2)], 2) - int(self.reg[int(self.second(), 2)], 2)) * 0xff
-        self.reg[int(self.first(), 2)] = f'{subbed:08b}'
+        self.reg[self.first()] = (self.reg[self.first()] - self.reg[self.second()]) & 0xff
 
     def MUL(self):
         """Multiply."""
-        mulled = (int(self.reg[int(self.first(), 2)], 2) * int(self.reg[int(self.second(), 2)], 2)) & 0xff
-        self.reg[int(self.first(), 2)] = f'{mulled:08b}'
+        self.reg[self.first()] = (self.reg[self.first()] * self.reg[self.second()]) & 0xff
 
     def DIV(self):
         """Integer divide."""
-        dived = (int(self.reg[int(self.first(), 2)], 2) >> int(self.reg[int(self.second(), 2)], 2)) & 0xff
-        self.reg[int(self.first(), 2)] = f'{dived:08b}'
+        self.reg[self.first()] = (self.reg[self.first()] // self.reg[self.second()]) & 0xff
 
     def MOD(self):
         """Modulus."""
-        modded = (int(self.reg[int(self.first(), 2)], 2) % int(self.reg[int(self.second(), 2)], 2)) & 0xff
-        self.reg[int(self.first(), 2)] = f'{modded:08b}'
+        self.reg[self.first()] = (self.reg[self.first()] % self.reg[self.second()]) & 0xff
 
     def AND(self):
-        anded = (int(self.reg[int(self.first(), 2)], 2) & int(self.reg[int(self.second(), 2)], 2)) & 0xff
-        self.reg[int(self.first(), 2)] = f'{anded:08b}'
+        self.reg[self.first()] = (self.reg[self.first()] & self.reg[self.second()]) & 0xff
 
     def OR(self):
-        ored = (int(self.reg[int(self.first(), 2)], 2) | int(self.reg[int(self.second(), 2)], 2)) & 0xff
-        self.reg[int(self.first(), 2)] = f'{ored:08b}'
+        self.reg[self.first()] = (self.reg[self.first()] | self.reg[self.second()]) & 0xff
 
     def XOR(self):
-        xored = (int(self.reg[int(self.first(), 2)], 2) ^ int(self.reg[int(self.second(), 2)], 2)) & 0xff
-        self.reg[int(self.first(), 2)] = f'{xored:08b}'
+        self.reg[self.first()] = (self.reg[self.first()] ^ self.reg[self.second()]) & 0xff
 
     def NOT(self):
-        noted = int(~int(self.reg[int(self.first(), 2)], 2), 2) & 0xff
-        self.reg[int(self.first(), 2)] = f'{noted:08b}'
+        self.reg[self.first()] = ~self.reg[self.first()] & 0xff
 
     def SHL(self):
         """Shift left."""
-        shled = (int(self.reg[int(self.first(), 2)], 2) << int(self.reg[int(self.second(), 2)], 2)) & 0xff
-        self.reg[int(self.first(), 2)] = f'{shled:08b}'
+        self.reg[self.first()] = (self.reg[self.first()] << self.reg[self.second()]) & 0xff
 
     def SHR(self):
         """Shift right."""
-        shred = (int(self.reg[int(self.first(), 2)], 2) >> int(self.reg[int(self.second(), 2)], 2)) & 0xff
-        self.reg[int(self.first(), 2)] = f'{shred:08b}'
+        self.reg[self.first()] = (self.reg[self.first()] >> self.reg[self.second()]) & 0xff
 
     def CMP(self):
         """Make a comparison and set the appropriate fl bit.
@@ -319,16 +413,13 @@ class CPU:
         E Equal: during a CMP, set to 1 if registerA is equal to registerB, zero
           otherwise.
         """
-        comp_a, comp_b = int(self.reg[int(self.first(), 2)], 2), int(self.reg[int(self.second(), 2)], 2)
+        comp_a, comp_b = self.reg[self.first()], self.reg[self.second()]
         if comp_a == comp_b:
-            self.fl = self.fl & 0b00000001
-            self.fl = self.fl | 0b00000001
+            self.fl = 0b00000001
         if comp_a > comp_b:
-            self.fl = self.fl & 0b00000010
-            self.fl = self.fl | 0b00000010
+            self.fl = 0b00000010
         if comp_a < comp_b:
-            self.fl = self.fl & 0b00000100
-            self.fl = self.fl | 0b00000100
+            self.fl = 0b00000100
 
     def trace(self):
         """
@@ -337,12 +428,12 @@ class CPU:
         """
 
         print(f"TRACE: pc: {self.pc}, fl: {self.fl}, "
-              f"ram: {self.ram_read(self.pc)}, "
-              f"ram +: {self.ram_read(self.pc + 1)}, ram ++: {self.ram_read(self.pc + 2)},", end='')
+              f"ram: {self.ram_read(self.pc):08b}, "
+              f"ram +: {self.ram_read(self.pc + 1):08b}, ram ++: {self.ram_read(self.pc + 2):08b},", end='')
 
         print('\nRegisters: ')
         for i in range(8):
-            print(f"{self.reg[i]}", end=', ')
+            print(f"{self.reg[i]:08b}", end=', ')
         print('\n\n')
 
     def ram_read(self, address):
@@ -353,45 +444,45 @@ class CPU:
         """Set the ram address to value."""
         self.ram[address] = value
 
-    def run(self):
-        """Run the CPU."""
-        # Initialize timer and keyboard listener.
-        then = datetime.now()
+    def run(self, until: int = None):
+        """Run the CPU until HLT, or until the pc runs off the end of memory.
+
+        Stop before the cycle that would execute address <until> if given, e.g. to snapshot a checkpoint and fork
+        from it. Resuming then runs exactly the cycles an uninterrupted run would have.
+        """
+        # Initialize keyboard listener.
         with NonBlockingConsole() as nbc:
 
             # Continue until HLT reached.
-            while True:
+            while not self.halted and self.pc != until:
                 args = 0xff  # ram[args] and ram[args + 1] hold values for registers arg_1 and arg_2.
 
-                if self.interrupts:
-                    # Check time interrupt.
-                    now = datetime.now()
-                    time = (now - then).seconds
-                    if time >= 1:
-                        then = datetime.now()
-                        self.reg[self.IS] = '00000001'
+                # Check time interrupt. A fire while interrupts are off stays pending in IS until they're back on.
+                if self.clock.tick():
+                    self.reg[self.IS] |= 0b00000001
 
+                if self.interrupts:
                     # Check keyboard interrupt.
                     key = nbc.get_data()
                     if key:
                         if key == '\x1b':  # x1b is ESC
                             self.HLT()
-                        self.ram_write(self.KEY, f'{ord(key):08b}')
-                        self.reg[self.IS] = '00000010'
+                        self.ram_write(self.KEY, ord(key))
+                        self.reg[self.IS] = 0b00000010
 
                     # Check if any interrupts have been triggered.
-                    mask = int(self.reg[self.IM], 2) & int(self.reg[self.IS], 2)
+                    mask = self.reg[self.IM] & self.reg[self.IS]
                     for i in range(8):
                         interrupted = (mask >> i) & 1 == 1
                         if interrupted:
                             # Write the address of the triggered interrupt vector to ram[args].
-                            self.ram_write(args, f'{(args - 7) + i:08b}')
+                            self.ram_write(args, (args - 7) + i)
                             self.INT()
                             break
-                if isinstance(self.ram_read(self.pc), int):
-                    return self.next_room
+                if self.pc >= len(self.ram):
+                    break
                 # Retrieve and decode instruction from memory.
-                instruction = int(self.ram_read(self.pc), 2)
+                instruction = self.ram_read(self.pc)
                 _bytes = instruction >> 6  # Number of places to advance pc.
                 alu = (instruction & 0b00100000) >> 5  # 1 if an alu instruction.
                 adv_pc = (instruction & 0b00010000) >> 4  # 1 if instruction advances pc.
@@ -411,10 +502,121 @@ class CPU:
                 # self.trace()
 
                 # Call the operation from the op_map.
-                if op_code in self.op_map[alu][adv_pc]:
+                if self.op_map[alu][adv_pc] and op_code in self.op_map[alu][adv_pc]:
                     info = self.op_map[alu][adv_pc][op_code]()
                     if info:
                         self.next_room += info
                 else:
                     print(f'Unknown instruction {op_code} at address {self.pc}')
+                    if self.profiler:
+                        print(self.profiler.dump_ring())
                     # sys.exit(-1)
+        if self.profiler:
+            print(self.profiler.dump_ring())
+        return self.next_room
+
+    def profile(self, ring_size: int = 32) -> 'Profiler':
+        """Count and time every instruction run from now on and keep the last <ring_size> in a ring buffer.
+
+        The ring buffer is printed on halt and on unknown instructions. Call the profiler's detach() to stop.
+        """
+        self.profiler = Profiler(self, ring_size)
+        return self.profiler
+
+
+POWER_ON = CPU().snapshot()._replace(clock=None)
+
+
+class Profiler:
+    """Per-opcode and per-pc counts, per-handler time and a ring buffer of recent instructions for a CPU.
+
+    Profiling swaps the handlers in the CPU's op_map for timing wrappers, so an unprofiled CPU runs exactly as
+    before. Ring buffer entries are (address, mnemonic, operand 1, operand 2).
+    """
+
+    def __init__(self, cpu: CPU, ring_size: int = 32):
+        self.cpu = cpu
+        self.counts = Counter()
+        self.pc_counts = Counter()
+        self.times = Counter()
+        self.ring = deque(maxlen=ring_size)
+        self.original = {alu: {adv_pc: dict(functions) if functions else functions
+                               for adv_pc, functions in by_pc.items()}
+                         for alu, by_pc in cpu.op_map.items()}
+        for alu, by_pc in cpu.op_map.items():
+            for adv_pc, functions in by_pc.items():
+                for op_code, function in (functions or {}).items():
+                    functions[op_code] = self.wrap(function, adv_pc)
+
+    def wrap(self, function, adv_pc: int):
+        """Time and record each call of an instruction <function>."""
+        name = function.__name__
+        # The pc has moved past the operands, and past the instruction unless it sets the pc itself.
+        back = OPERANDS[name] + (0 if adv_pc else 1)
+        cpu, counts, pc_counts, times, ring = self.cpu, self.counts, self.pc_counts, self.times, self.ring
+
+        def profiled():
+            address = cpu.pc - back
+            ring.append((address, name, cpu.ram[cpu.arg_1], cpu.ram[cpu.arg_2]))
+            start = time.perf_counter()
+            result = function()
+            times[name] += time.perf_counter() - start
+            counts[name] += 1
+            pc_counts[address] += 1
+            return result
+        profiled.__name__ = name
+        return profiled
+
+    def detach(self):
+        """Put the CPU's original handlers back."""
+        for alu, by_pc in self.original.items():
+            for adv_pc, functions in by_pc.items():
+                self.cpu.op_map[alu][adv_pc] = functions
+        self.cpu.profiler = None
+
+    def dump_ring(self) -> str:
+        """The last instructions run, oldest first."""
+        lines = ['Last instructions:']
+        for address, name, arg_1, arg_2 in self.ring:
+            operands = ', '.join(f'{arg:02x}' for arg in (arg_1, arg_2)[:OPERANDS[name]])
+            lines.append(f'  {address:02x}: {name} {operands}'.rstrip())
+        return '\n'.join(lines)
+
+    def report(self, top: int = 10) -> str:
+        """Instruction counts and handler time per opcode, and the hottest addresses."""
+        lines = [f'{"opcode":<6} {"count":>9} {"total ms":>10} {"mean us":>9}']
+        for name, count in self.counts.most_common():
+            lines.append(f'{name:<6} {count:>9} {self.times[name] * 1000:>10.3f} '
+                         f'{self.times[name] / count * 1e6:>9.2f}')
+        lines.append(f'Hottest addresses: '
+                     f'{", ".join(f"{address:02x} x{count}" for address, count in self.pc_counts.most_common(top))}')
+        return '\n'.join(lines)
+
+
+class CPUPool:
+    """Reusable CPUs, so decoding a program doesn't build a new CPU and its op_map each time.
+
+    Each new CPU gets a clock from <clock>, e.g. CPUPool(clock=VirtualClock) for headless decoding.
+    """
+
+    def __init__(self, clock=RealClock):
+        self.idle = []
+        self.clock = clock
+
+    def acquire(self, program: bytes = b'') -> CPU:
+        """Get a reset CPU with <program> loaded."""
+        cpu = self.idle.pop() if self.idle else CPU(clock=self.clock())
+        cpu.reset(program)
+        return cpu
+
+    def release(self, cpu: CPU):
+        self.idle.append(cpu)
+
+    @contextmanager
+    def borrow(self, program: bytes = b''):
+        """Use a pooled CPU for the body of a with block."""
+        cpu = self.acquire(program)
+        try:
+            yield cpu
+        finally:
+            self.release(cpu)
@@ -0,0 +1,167 @@
+"""Structured event log with a background writer.
+
+Hot paths only enqueue a small (time, level, event, fields) record. A writer thread renders records to text,
+or to JSON lines, and writes them out, so formatting and console I/O stay off the player's critical path. Every
+log in a process shares one writer thread, so records from several players come out in the order they were logged.
+
+    >>> log = EventLog(level=INFO, sample={'status': 10})  # Keep every 10th status event.
+    >>> log.info('status', room_id=42, gold=100)
+"""
+
+import atexit
+import json
+import queue
+import sys
+import threading
+import time
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', WARNING: 'WARNING', ERROR: 'ERROR'}
+
+
+def render_status(fields: dict) -> str:
+    """Render a player status event the way print_status_info always has."""
+    inventory = ', '.join([name[:-9] for name in fields['inventory']]) if fields['inventory'] else 'None'
+    players = ', '.join(fields['players']) if fields['players'] else 'None'
+    return (f'\nIn room {fields["room_id"]}. \nCurrent cooldown: {fields["cooldown"]}'
+            f'\nInventory: {inventory} '
+            f'\nPlayers in room: {players} '
+            f'\nGold: {fields["gold"]}, Lambda Coins: {fields["coins"]}, Snitches: {fields["snitches"]}'
+            f'\nEncumbrance: {fields["encumbrance"]}, Strength: {fields["strength"]}')
+
+
+def render_note(fields: dict) -> str:
+    return fields['text']
+
+
+def render_messages(fields: dict) -> str:
+    return f'\n{" ".join(fields["messages"])}'
+
+
+def render_errors(fields: dict) -> str:
+    return f'\nError: {fields["errors"]}'
+
+
+def render_snitch(fields: dict) -> str:
+    outcome = 'Took the snitch' if fields['taken'] else 'Missed the snitch'
+    return (f'\n{outcome} in room {fields["room_id"]}, {fields["seconds"]}s after wishing. '
+            f'Cooldown left after planning: {fields["slack"]}s')
+
+
+def render_metrics(fields: dict) -> str:
+    return f'\n{fields["summary"]}'
+
+
+RENDERERS = {'status': render_status,
+             'note': render_note,
+             'messages': render_messages,
+             'errors': render_errors,
+             'snitch': render_snitch,
+             'metrics': render_metrics}
+
+
+class Writer:
+    """Background thread writing the records of every EventLog in the process, started on first use."""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def put(self,
+            log: 'EventLog',
+            record: tuple) -> None:
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self._write, daemon=True)
+                    self.thread.start()
+                    atexit.register(self.flush)
+        self.queue.put((log, record))
+
+    def _write(self) -> None:
+        # Streams written to since they were last flushed.
+        unflushed = set()
+        while True:
+            log, record = self.queue.get()
+            try:
+                log.stream.write(log.render(record) + '\n')
+                unflushed.add(log.stream)
+            except (OSError, ValueError):
+                # A closed or broken stream loses the record, but mustn't stop the writer.
+                pass
+            finally:
+                self.queue.task_done()
+            # Flush once the backlog is written rather than after every record.
+            if self.queue.empty():
+                for stream in unflushed:
+                    try:
+                        stream.flush()
+                    except (OSError, ValueError):
+                        pass
+                unflushed.clear()
+
+    def flush(self, timeout: float = 5) -> None:
+        """Wait until every queued record has been written, for at most <timeout> seconds."""
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(.01)
+
+
+WRITER = Writer()
+
+
+class EventLog:
+    """Leveled, sampled event log written by a background thread."""
+
+    def __init__(self,
+                 level: int = INFO,
+                 sample: dict = None,
+                 stream=None,
+                 json_lines: bool = False):
+        self.level = level
+        # {event: n} keeps every nth record of that event.
+        self.sample = sample or {}
+        self.counts = {}
+        self.stream = stream or sys.stdout
+        self.json_lines = json_lines
+
+    def emit(self,
+             level: int,
+             event: str,
+             **fields) -> None:
+        if level < self.level:
+            return
+        rate = self.sample.get(event)
+        if rate:
+            count = self.counts.get(event, 0)
+            self.counts[event] = count + 1
+            if count % rate:
+                return
+        WRITER.put(self, (time.time(), level, event, fields))
+
+    def debug(self, event: str, **fields) -> None:
+        self.emit(DEBUG, event, **fields)
+
+    def info(self, event: str, **fields) -> None:
+        self.emit(INFO, event, **fields)
+
+    def warning(self, event: str, **fields) -> None:
+        self.emit(WARNING, event, **fields)
+
+    def error(self, event: str, **fields) -> None:
+        self.emit(ERROR, event, **fields)
+
+    def render(self, record: tuple) -> str:
+        when, level, event, fields = record
+        if self.json_lines:
+            return json.dumps({'t': round(when, 3), 'level': LEVEL_NAMES.get(level, level),
+                               'event': event, **fields}, default=str)
+        renderer = RENDERERS.get(event)
+        if renderer:
+            return renderer(fields)
+        return f'\n{event}: {", ".join(f"{key}={value}" for key, value in fields.items())}'
+
+    def flush(self, timeout: float = 5) -> None:
+        """Wait until every queued record has been written, for at most <timeout> seconds."""
+        WRITER.flush(timeout)
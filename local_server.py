@@ -0,0 +1,506 @@
+"""Local stand-in for the Lambda Treasure Hunt server.
+
+Builds its rooms from world.pickle and serves the api/adv/* and api/bc/* endpoints GamePlayer uses, so
+strategies can be benchmarked without the live server or its hours of cooldowns.
+
+    >>> from local_server import benchmark
+    >>> benchmark(lambda game: game.auto_play(), sim_hours=2, compression=100)
+
+Every action charges a cooldown in simulated seconds. The cooldown reported to the player is divided by the
+time compression factor, so the player only waits a fraction of it in real time. Each player's simulated
+clock is the sum of cooldowns charged to it, so a seeded run makes the same moves for the same gold.
+"""
+
+import json
+import pickle
+import random
+import threading
+import time
+from hashlib import sha256
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# name: (weight, value)
+TREASURES = {'tiny treasure': (1, 100),
+             'small treasure': (2, 200),
+             'shiny treasure': (3, 400),
+             'great treasure': (5, 800),
+             'amazing treasure': (8, 1200)}
+# name: (itemtype, weight, level)
+WEARABLES = {'nice boots': ('FOOTWEAR', 1, 1),
+             'sturdy boots': ('FOOTWEAR', 1, 2),
+             'nice jacket': ('BODYWEAR', 2, 1),
+             'sturdy jacket': ('BODYWEAR', 2, 2)}
+# Simulated seconds charged for each kind of action.
+COOLDOWNS = {'move': 15.0,
+             'fly': 10.0,
+             'dash': 10.0,
+             'dash_room': 1.0,
+             'action': 2.0,
+             'status': 1.0,
+             'pray': 5.0,
+             'warp': 10.0,
+             'penalty': 5.0}
+SHRINES = {22: 'flight', 461: 'dash', 374: 'warp'}
+SHOP, PIRATE, TRANSMOG = 1, 467, 495
+WELLS = (55, 555)
+BASE_STRENGTH = 10
+
+
+class Player:
+    """Server-side state of one player, keyed by their token."""
+
+    def __init__(self, token: str, abilities: tuple, name_changed: bool):
+        self.token = token
+        self.name = f'player{token[:6]}'
+        self.room = 0
+        self.inventory = []
+        self.bodywear = None
+        self.footwear = None
+        self.gold = 0
+        self.coins = 0
+        self.snitches = 0
+        self.abilities = set(abilities)
+        self.name_changed = name_changed
+        self.sim_time = 0.0
+        self.ready_at = 0.0
+        self.requests = 0
+
+    @property
+    def encumbrance(self) -> int:
+        return sum(item_weight(item) for item in self.inventory)
+
+    @property
+    def strength(self) -> int:
+        return BASE_STRENGTH + (WEARABLES[self.bodywear][2] if self.bodywear else 0)
+
+
+def item_weight(item: str) -> int:
+    """Weight of the <item> by name."""
+    if item in TREASURES:
+        return TREASURES[item][0]
+    return WEARABLES[item][1]
+
+
+def clue_program(text: str) -> list:
+    """Assemble an LS-8 program that prints <text>, one binary line per byte."""
+    lines = []
+    for character in text:
+        # LDI R1, character; PRA R1
+        lines += ['10000010', '00000001', f'{ord(character):08b}', '01001000', '00000001']
+    lines.append('00000001')  # HLT
+    return lines
+
+
+class GameWorld:
+    """Simulated game state shared by every player on the local server."""
+
+    def __init__(self,
+                 world_file: str = 'world.pickle',
+                 seed: int = 0,
+                 treasures: int = 100,
+                 wearables: int = 10,
+                 difficulty: int = 4,
+                 cooldowns: dict = None,
+                 compression: float = 1.0,
+                 abilities: tuple = ('flight', 'dash', 'warp'),
+                 name_changed: bool = True):
+        with open(world_file, 'rb') as f:
+            self.world = pickle.load(f)
+        self.rng = random.Random(seed)
+        self.cooldowns = {**COOLDOWNS, **(cooldowns or {})}
+        self.compression = compression
+        self.abilities = abilities
+        self.name_changed = name_changed
+        self.difficulty = difficulty
+        self.last_proof = self.rng.randint(0, 10 ** 6)
+        self.items = {room: [] for room in self.world}
+        for _ in range(treasures):
+            self.spawn(self.rng.choice(list(TREASURES)))
+        for _ in range(wearables):
+            self.spawn(self.rng.choice(list(WEARABLES)))
+        self.mine_room = self.rng.randint(0, 499)
+        self.snitch_room = self.rng.randint(500, 999)
+        self.players = {}
+        # Simulated seconds each player may spend. Later requests are refused, so a run always ends on the same one.
+        self.sim_limit = None
+        self.lock = threading.Lock()
+
+    def spawn(self, item: str) -> None:
+        """Drop <item> in a random room of the first dimension."""
+        self.items[self.rng.randint(0, 499)].append(item)
+
+    def player(self, token: str) -> Player:
+        if token not in self.players:
+            self.players[token] = Player(token, self.abilities, self.name_changed)
+        return self.players[token]
+
+    def room_info(self, player: Player) -> dict:
+        meta = self.world[player.room]['meta']
+        return {'room_id': player.room,
+                'title': meta['title'],
+                'description': meta['description'],
+                'coordinates': meta['coordinates'],
+                'elevation': meta['elevation'],
+                'terrain': meta['terrain'],
+                'players': [other.name for other in self.players.values()
+                            if other.room == player.room and other is not player],
+                'items': list(self.items[player.room]),
+                'exits': meta['exits']}
+
+    def handle(self, token: str, endpoint: str, data: dict) -> tuple:
+        """Run the <endpoint> for the player with <token>. Return the status code and response."""
+        with self.lock:
+            player = self.player(token)
+            if self.sim_limit is not None and player.sim_time >= self.sim_limit:
+                return 503, {'errors': ['Out of simulated time']}
+            player.requests += 1
+            now = time.monotonic()
+            if now < player.ready_at:
+                remaining = (player.ready_at - now) * self.compression + self.cooldowns['penalty']
+                return self.respond(player, {}, remaining, errors=['Cooldown in effect: +5s CD'])
+            action = getattr(self, endpoint.replace('/', '_'), None)
+            if action is None or not endpoint.startswith(('adv/', 'bc/')):
+                return 404, {'errors': [f'Unknown endpoint {endpoint}']}
+            return action(player, data)
+
+    def respond(self,
+                player: Player,
+                response: dict,
+                cooldown: float,
+                errors: list = None,
+                messages: list = None) -> tuple:
+        """Charge <cooldown> simulated seconds and build the response."""
+        player.sim_time += cooldown
+        player.ready_at = time.monotonic() + cooldown / self.compression
+        response = {**response,
+                    'cooldown': cooldown / self.compression,
+                    'errors': errors or [],
+                    'messages': messages or []}
+        return (400 if errors else 200), response
+
+    def adv_init(self, player: Player, data: dict) -> tuple:
+        return self.respond(player, self.room_info(player), self.cooldowns['status'])
+
+    def travel_cost(self, player: Player, room: int, fly: bool) -> tuple:
+        """Cooldown and messages for one step into <room>."""
+        meta = self.world[room]['meta']
+        messages = []
+        if fly:
+            cooldown = self.cooldowns['fly']
+            if meta['terrain'] == 'CAVE':
+                cooldown += 10
+                messages.append('You bump your head on the cave ceiling: +10s CD')
+        else:
+            cooldown = self.cooldowns['move'] + 5 * meta['elevation']
+        if player.encumbrance > player.strength:
+            cooldown *= 2
+            messages.append('Heavily Encumbered: +100% CD')
+        return cooldown, messages
+
+    def step(self, player: Player, data: dict, fly: bool) -> tuple:
+        direction = data.get('direction')
+        next_room = self.world[player.room].get(f'to_{direction}')
+        if direction not in self.world[player.room]['meta']['exits'] or next_room is None:
+            return self.respond(player, self.room_info(player), self.cooldowns['move'],
+                                errors=['You cannot move in that direction: +5s CD'])
+        if fly and 'flight' not in player.abilities:
+            return self.respond(player, self.room_info(player), self.cooldowns['action'],
+                                errors=['You cannot fly.'])
+        player.room = next_room
+        cooldown, messages = self.travel_cost(player, next_room, fly)
+        messages.insert(0, f'You have {"flown" if fly else "walked"} {direction}.')
+        if str(data.get('next_room_id')) == str(next_room):
+            cooldown /= 2
+            messages.append('Wise Explorer: -50% CD')
+        return self.respond(player, self.room_info(player), cooldown, messages=messages)
+
+    def adv_move(self, player: Player, data: dict) -> tuple:
+        return self.step(player, data, fly=False)
+
+    def adv_fly(self, player: Player, data: dict) -> tuple:
+        return self.step(player, data, fly=True)
+
+    def adv_dash(self, player: Player, data: dict) -> tuple:
+        direction = data.get('direction')
+        rooms = [int(room) for room in str(data.get('next_room_ids', '')).split(',') if room]
+        expected, room = [], player.room
+        for _ in rooms:
+            room = self.world[room].get(f'to_{direction}')
+            if room is None or room is False:
+                break
+            expected.append(room)
+        if 'dash' not in player.abilities or rooms != expected or int(data.get('num_rooms', 0)) != len(rooms):
+            return self.respond(player, self.room_info(player), self.cooldowns['action'],
+                                errors=['Invalid dash.'])
+        player.room = rooms[-1]
+        cooldown = self.cooldowns['dash'] + self.cooldowns['dash_room'] * len(rooms)
+        return self.respond(player, self.room_info(player), cooldown,
+                            messages=[f'You have dashed {len(rooms)} rooms {direction}.'])
+
+    def adv_take(self, player: Player, data: dict) -> tuple:
+        name = data.get('name', '')
+        if name == 'golden snitch':
+            if player.room != self.snitch_room:
+                return self.respond(player, self.room_info(player), self.cooldowns['action'],
+                                    errors=['Item not found'])
+            player.snitches += 1
+            self.snitch_room = self.rng.randint(500, 999)
+            return self.respond(player, self.room_info(player), self.cooldowns['action'],
+                                messages=['You have picked up a golden snitch!'])
+        if name not in self.items[player.room]:
+            return self.respond(player, self.room_info(player), self.cooldowns['action'],
+                                errors=['Item not found'])
+        self.items[player.room].remove(name)
+        player.inventory.append(name)
+        return self.respond(player, self.room_info(player), self.cooldowns['action'],
+                            messages=[f'You have picked up {name}'])
+
+    def adv_drop(self, player: Player, data: dict) -> tuple:
+        name = data.get('name', '')
+        if name not in player.inventory:
+            return self.respond(player, self.room_info(player), self.cooldowns['action'],
+                                errors=['Item not found'])
+        player.inventory.remove(name)
+        self.items[player.room].append(name)
+        return self.respond(player, self.room_info(player), self.cooldowns['action'],
+                            messages=[f'You have dropped {name}'])
+
+    def adv_examine(self, player: Player, data: dict) -> tuple:
+        name = data.get('name', '')
+        if name.upper() == 'WELL' and player.room in WELLS:
+            target = self.snitch_room if player.room >= 500 else self.mine_room
+            text = f'Mine your coin in room {target}' if player.room < 500 else f'Find the snitch in room {target}'
+            description = 'You see a faint pattern in the water...\n\n' + '\n'.join(clue_program(text))
+            return self.respond(player, {'name': 'Wishing Well', 'description': description},
+                                self.cooldowns['action'])
+        if name not in self.items[player.room] and name not in player.inventory:
+            return self.respond(player, {}, self.cooldowns['action'], errors=['Item not found'])
+        if name in TREASURES:
+            itemtype, weight, level = 'TREASURE', TREASURES[name][0], 1
+        else:
+            itemtype, weight, level = WEARABLES[name]
+        return self.respond(player, {'name': name,
+                                     'description': f'It is a {name}.',
+                                     'weight': weight,
+                                     'itemtype': itemtype,
+                                     'level': level,
+                                     'exp': 0,
+                                     'attributes': '{}'}, self.cooldowns['action'])
+
+    def adv_wear(self, player: Player, data: dict) -> tuple:
+        name = data.get('name', '')
+        if name not in player.inventory or name not in WEARABLES:
+            return self.respond(player, {}, self.cooldowns['action'], errors=['You cannot wear that.'])
+        slot = 'footwear' if WEARABLES[name][0] == 'FOOTWEAR' else 'bodywear'
+        if getattr(player, slot):
+            player.inventory.append(getattr(player, slot))
+        player.inventory.remove(name)
+        setattr(player, slot, name)
+        return self.respond(player, {}, self.cooldowns['action'], messages=[f'You wear {name}'])
+
+    def adv_undress(self, player: Player, data: dict) -> tuple:
+        name = data.get('name', '')
+        for slot in ('footwear', 'bodywear'):
+            if getattr(player, slot) == name:
+                setattr(player, slot, None)
+                player.inventory.append(name)
+                return self.respond(player, {}, self.cooldowns['action'], messages=[f'You remove {name}'])
+        return self.respond(player, {}, self.cooldowns['action'], errors=['You are not wearing that.'])
+
+    def adv_sell(self, player: Player, data: dict) -> tuple:
+        name = data.get('name', '')
+        if player.room != SHOP or name not in player.inventory or name not in TREASURES:
+            return self.respond(player, self.room_info(player), self.cooldowns['action'],
+                                errors=['You cannot sell that here.'])
+        value = TREASURES[name][1]
+        if data.get('confirm') != 'yes':
+            return self.respond(player, self.room_info(player), self.cooldowns['action'],
+                                messages=[f"I'll give you {value} gold for that {name.title()}.",
+                                          f"(include 'confirm':'yes' to sell {name.title()})"])
+        player.inventory.remove(name)
+        player.gold += value
+        self.spawn(name)
+        return self.respond(player, self.room_info(player), self.cooldowns['action'],
+                            messages=[f"Thanks, I'll take that {name.title()}.",
+                                      f'You have received {value} gold.'])
+
+    def adv_status(self, player: Player, data: dict) -> tuple:
+        return self.respond(player, {'name': player.name,
+                                     'encumbrance': player.encumbrance,
+                                     'strength': player.strength,
+                                     'speed': 10,
+                                     'gold': player.gold,
+                                     'bodywear': player.bodywear or 'None',
+                                     'footwear': player.footwear or 'None',
+                                     'inventory': list(player.inventory),
+                                     'abilities': sorted(player.abilities),
+                                     'status': [],
+                                     'snitches': player.snitches}, self.cooldowns['status'])
+
+    def adv_pray(self, player: Player, data: dict) -> tuple:
+        if player.room not in SHRINES:
+            return self.respond(player, self.room_info(player), self.cooldowns['action'],
+                                errors=['There is nothing to pray to here.'])
+        player.abilities.add(SHRINES[player.room])
+        return self.respond(player, self.room_info(player), self.cooldowns['pray'],
+                            messages=[f'You notice your body starts to {SHRINES[player.room]}.'])
+
+    def adv_change_name(self, player: Player, data: dict) -> tuple:
+        if player.room != PIRATE or player.gold < 1000:
+            return self.respond(player, self.room_info(player), self.cooldowns['action'],
+                                errors=['You cannot change your name here.'])
+        player.gold -= 1000
+        player.name = data.get('name', player.name)
+        player.name_changed = True
+        return self.respond(player, self.room_info(player), self.cooldowns['action'],
+                            messages=[f'You have changed your name to {player.name}.'])
+
+    def adv_warp(self, player: Player, data: dict) -> tuple:
+        if 'warp' not in player.abilities:
+            return self.respond(player, self.room_info(player), self.cooldowns['action'],
+                                errors=['You cannot warp.'])
+        player.room = player.room + 500 if player.room < 500 else player.room - 500
+        return self.respond(player, self.room_info(player), self.cooldowns['warp'],
+                            messages=['You have traveled to an alternate dimension.'])
+
+    def adv_transmogrify(self, player: Player, data: dict) -> tuple:
+        name = data.get('name', '')
+        if player.room != TRANSMOG or name not in player.inventory or player.coins < 1:
+            return self.respond(player, self.room_info(player), self.cooldowns['action'],
+                                errors=['You cannot transmogrify that.'])
+        player.coins -= 1
+        player.inventory.remove(name)
+        new_item = self.rng.choice(list(WEARABLES))
+        player.inventory.append(new_item)
+        return self.respond(player, self.room_info(player), self.cooldowns['action'],
+                            messages=[f'Your {name} transforms into {new_item}.'])
+
+    def bc_last_proof(self, player: Player, data: dict) -> tuple:
+        return self.respond(player, {'proof': self.last_proof, 'difficulty': self.difficulty},
+                            self.cooldowns['status'])
+
+    def bc_mine(self, player: Player, data: dict) -> tuple:
+        proof = data.get('proof')
+        hash_ = sha256(f'{self.last_proof}{proof}'.encode()).hexdigest()
+        if not player.name_changed or player.room != self.mine_room:
+            return self.respond(player, {}, self.cooldowns['action'], errors=['You cannot mine here.'])
+        if hash_[:self.difficulty] != '0' * self.difficulty:
+            return self.respond(player, {}, self.cooldowns['action'], errors=['Invalid proof'])
+        player.coins += 1
+        self.last_proof = int(proof)
+        self.mine_room = self.rng.randint(0, 499)
+        return self.respond(player, {}, self.cooldowns['action'], messages=['New Block Forged'])
+
+    def bc_get_balance(self, player: Player, data: dict) -> tuple:
+        return self.respond(player, {}, self.cooldowns['status'],
+                            messages=[f'You have a balance of {player.coins}.0 Lambda Coins'])
+
+    def stats(self) -> dict:
+        """Throughput of every player per simulated hour."""
+        stats = {}
+        for token, player in self.players.items():
+            hours = player.sim_time / 3600 or float('inf')
+            stats[token] = {'requests': player.requests,
+                            'sim_hours': player.sim_time / 3600,
+                            'gold': player.gold,
+                            'coins': player.coins,
+                            'snitches': player.snitches,
+                            'gold_per_hour': player.gold / hours,
+                            'coins_per_hour': player.coins / hours,
+                            'snitches_per_hour': player.snitches / hours}
+        return stats
+
+
+class GameRequestHandler(BaseHTTPRequestHandler):
+    """Route HTTP requests to the GameWorld of the server."""
+
+    def route(self) -> None:
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            data = {}
+        token = self.headers.get('Authorization', '').replace('Token ', '')
+        endpoint = self.path.strip('/')
+        if endpoint.startswith('api/'):
+            endpoint = endpoint[len('api/'):]
+        if endpoint == 'emu/stats':
+            code, response = 200, self.server.game.stats()
+        else:
+            code, response = self.server.game.handle(token, endpoint, data)
+        payload = json.dumps(response).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = route
+    do_POST = route
+
+    def log_message(self, format, *args) -> None:
+        """Keep the console for the player."""
+        pass
+
+
+def serve(host: str = 'localhost',
+          port: int = 0,
+          **world_kwargs) -> ThreadingHTTPServer:
+    """Start a local game server in a background thread. Its URL is server.url."""
+    server = ThreadingHTTPServer((host, port), GameRequestHandler)
+    server.game = GameWorld(**world_kwargs)
+    server.url = f'http://{host}:{server.server_address[1]}/'
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def benchmark(strategy,
+              sim_hours: float = 1.0,
+              seed: int = 0,
+              **world_kwargs) -> dict:
+    """Run <strategy>(game) against a local server until the player has spent <sim_hours> of simulated time.
+
+    The world and the player's random choices both follow <seed>. Return the player's throughput stats.
+    """
+    from play_it import GamePlayer
+    server = serve(seed=seed, **world_kwargs)
+    server.game.sim_limit = sim_hours * 3600
+    # Every benchmark starts from a fresh player, never a saved session.
+    game = GamePlayer(url=server.url, seed=seed, session=None)
+    # The server's cooldowns are compressed, so the margin for clock differences is too.
+    game.cooldown_margin /= server.game.compression
+    stopped = threading.Event()
+
+    def run() -> None:
+        try:
+            strategy(game)
+        except Exception:
+            # Once out of time, the player's requests are refused, then it loses its connection as we shut down.
+            player = server.game.players.get(game.key)
+            if not stopped.is_set() and not (player and player.sim_time >= server.game.sim_limit):
+                raise
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    while thread.is_alive():
+        player = server.game.players.get(game.key)
+        if player and player.sim_time >= server.game.sim_limit:
+            break
+        time.sleep(.05)
+    stats = server.game.stats().get(game.key, {})
+    stopped.set()
+    server.shutdown()
+    server.server_close()
+    return stats
+
+
+if __name__ == '__main__':
+    server = serve(port=8000)
+    print(f'Serving the Lambda Treasure Hunt at {server.url}')
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
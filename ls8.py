@@ -0,0 +1,166 @@
+"""LS-8 toolchain: assembler, disassembler and the .ls8b binary program format.
+
+An .ls8b file is the 4 byte magic b'LS8B' followed by the raw program bytes, so loading one is a single read
+copied straight into the CPU's ram.
+
+    $ python ls8.py asm program.asm program.ls8b
+    $ python ls8.py dis clue.ls8
+    $ python ls8.py bin clue.ls8 clue.ls8b
+
+Assembly is one instruction per line, with '#' or ';' comments:
+
+    Loop:           # Labels can be used as immediates.
+        LDI R0, 'M'
+        PRA R0
+        LDI R1, Loop
+        DB 0x0a     # Raw data bytes.
+        HLT
+"""
+
+import mmap
+import os
+import re
+import sys
+from cpu import CPU, OPERANDS
+
+MAGIC = b'LS8B'
+
+
+def _opcodes() -> dict:
+    """Build {mnemonic: opcode} from the CPU's op_map."""
+    opcodes = {}
+    for alu, by_pc in CPU().op_map.items():
+        for adv_pc, functions in by_pc.items():
+            for op_code, function in (functions or {}).items():
+                name = function.__name__
+                opcodes[name] = OPERANDS[name] << 6 | alu << 5 | adv_pc << 4 | op_code
+    return opcodes
+
+
+OPCODES = _opcodes()
+MNEMONICS = {opcode: name for name, opcode in OPCODES.items()}
+
+
+def _value(token: str, labels: dict) -> int:
+    """Parse a register, number, character or label operand."""
+    if token.upper().startswith('R') and token[1:].isdigit():
+        return int(token[1:])
+    if len(token) == 3 and token[0] == token[-1] == "'":
+        return ord(token[1])
+    if token in labels:
+        return labels[token]
+    return int(token, 0)
+
+
+def _operands(text: str) -> list:
+    """Split operands on commas, leaving the comma of a ',' character literal alone."""
+    return [token.strip() for token in re.findall(r"\s*('.'|[^,]+)", text) if token.strip()]
+
+
+def assemble(source: str) -> bytes:
+    """Assemble LS-8 <source> into program bytes."""
+    lines = []
+    for line in source.splitlines():
+        # Drop comments, but not a '#' or ';' character literal.
+        line = re.sub(r"('.')|[#;].*", lambda match: match.group(1) or '', line).strip()
+        if line:
+            lines.append(line)
+    # First pass finds the address of every label.
+    labels, address = {}, 0
+    for line in lines:
+        if line.endswith(':'):
+            labels[line[:-1]] = address
+            continue
+        mnemonic, _, operands = line.partition(' ')
+        mnemonic = mnemonic.upper()
+        if mnemonic == 'DB':
+            address += len(_operands(operands))
+        elif mnemonic in OPCODES:
+            address += 1 + OPERANDS[mnemonic]
+        else:
+            raise ValueError(f'Unknown instruction {mnemonic}')
+    program = bytearray()
+    for line in lines:
+        if line.endswith(':'):
+            continue
+        mnemonic, _, operands = line.partition(' ')
+        mnemonic = mnemonic.upper()
+        operands = _operands(operands)
+        if mnemonic != 'DB':
+            if len(operands) != OPERANDS[mnemonic]:
+                raise ValueError(f'{mnemonic} takes {OPERANDS[mnemonic]} operands: {line}')
+            program.append(OPCODES[mnemonic])
+        program.extend(_value(operand, labels) & 0xff for operand in operands)
+    return bytes(program)
+
+
+def parse_text(text: str) -> bytes:
+    """Parse the well's text format, one binary byte per line, into program bytes."""
+    program = bytearray()
+    for line in text.splitlines():
+        line = line.split('#')[0].strip()
+        if line:
+            program.append(int(line, 2))
+    return bytes(program)
+
+
+def disassemble(program: bytes) -> str:
+    """Listing of <program> with addresses, raw bytes and mnemonics. Printable LDI immediates are annotated."""
+    lines, address = [], 0
+    while address < len(program):
+        opcode = program[address]
+        name = MNEMONICS.get(opcode)
+        if name is None:
+            lines.append(f'{address:02x}: {opcode:02x}           DB 0x{opcode:02x}')
+            address += 1
+            continue
+        operands = list(program[address + 1:address + 1 + OPERANDS[name]])
+        raw = ' '.join(f'{byte:02x}' for byte in [opcode, *operands])
+        if name == 'LDI' and len(operands) == 2:
+            text = f'R{operands[0]}, {operands[1]}'
+            if 32 <= operands[1] < 127:
+                text += f"  ; '{chr(operands[1])}'"
+        else:
+            text = ', '.join(f'R{operand}' for operand in operands)
+        lines.append(f'{address:02x}: {raw:<12} {name} {text}'.rstrip())
+        address += 1 + OPERANDS[name]
+    return '\n'.join(lines)
+
+
+def write_image(path: str, program: bytes) -> None:
+    """Save <program> as an .ls8b image."""
+    with open(path, 'wb') as f:
+        f.write(MAGIC + program)
+
+
+def read_image(path: str) -> bytes:
+    """Map an .ls8b image and return its program bytes."""
+    with open(path, 'rb') as f:
+        # mmap refuses empty files, and anything shorter than the magic isn't an image anyway.
+        if os.fstat(f.fileno()).st_size < len(MAGIC):
+            raise ValueError(f'{path} is not an .ls8b image')
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as image:
+            if image[:len(MAGIC)] != MAGIC:
+                raise ValueError(f'{path} is not an .ls8b image')
+            return image[len(MAGIC):]
+
+
+def read_program(path: str) -> bytes:
+    """Read program bytes from an .ls8b image, or from the one-binary-byte-per-line text format."""
+    if path.endswith('.ls8b'):
+        return read_image(path)
+    with open(path) as f:
+        return parse_text(f.read())
+
+
+if __name__ == '__main__':
+    command, *paths = sys.argv[1:]
+    if command == 'asm':
+        with open(paths[0]) as f:
+            write_image(paths[1], assemble(f.read()))
+    elif command == 'dis':
+        print(disassemble(read_program(paths[0])))
+    elif command == 'bin':
+        write_image(paths[1], read_program(paths[0]))
+    else:
+        print(__doc__)
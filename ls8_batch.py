@@ -0,0 +1,257 @@
+"""Run many LS-8 programs at once in lockstep with NumPy.
+
+Every machine's ram, registers, pc and fl live in arrays (N x 256 ram, N x 8 registers). Each step groups the
+running machines by their current opcode and applies that instruction to the whole group as one array
+operation, so thousands of captured clues decode without a Python dispatch per instruction.
+
+    >>> batch = BatchCPU([read_program(path) for path in paths])
+    >>> batch.run()
+    >>> batch.outputs  # What each machine printed, as CPU.next_room would hold it.
+
+Instruction semantics match CPU, including operands being copied to ram[0xff] and down. Batches are headless:
+there is no keyboard, and the timer interrupt follows a virtual clock, firing every <timer_cycles> cycles like
+CPU(clock=VirtualClock(timer_cycles)). A machine that divides by zero or raises a bad interrupt vector stops with
+its error set.
+
+Each step pays NumPy's per-call overhead once for the whole batch, so the gain over CPU grows with the batch
+size. A hundred programs run no faster than on CPU.
+
+    $ python ls8_batch.py 2000  # Benchmark against CPU on 2000 programs.
+"""
+
+import contextlib
+import io
+import sys
+import time
+
+import numpy as np
+
+from cpu import CPU, OPERANDS
+from ls8 import MNEMONICS
+
+IS, IM, SP = 6, 5, 7
+ALU = {'ADD': np.add, 'SUB': np.subtract, 'MUL': np.multiply, 'AND': np.bitwise_and, 'OR': np.bitwise_or,
+       'XOR': np.bitwise_xor, 'SHL': np.left_shift, 'SHR': np.right_shift,
+       'DIV': np.floor_divide, 'MOD': np.remainder}
+JUMPS = {'JEQ': lambda fl: fl & 1 != 0,
+         'JNE': lambda fl: fl & 1 == 0,
+         'JGT': lambda fl: fl & 2 != 0,
+         'JGE': lambda fl: fl & 3 != 0,
+         'JLT': lambda fl: fl & 4 != 0,
+         'JLE': lambda fl: fl & 5 != 0}
+
+
+class BatchCPU:
+    """N LS-8 machines stepped together."""
+
+    def __init__(self, programs: list, timer_cycles: int = None):
+        n = len(programs)
+        self.timer_cycles = timer_cycles
+        self.cycles = 0
+        self.ram = np.zeros((n, 256), dtype=np.uint8)
+        for i, program in enumerate(programs):
+            self.ram[i, :len(program)] = np.frombuffer(bytes(program), dtype=np.uint8)
+        self.reg = np.zeros((n, 8), dtype=np.uint8)
+        self.reg[:, SP] = 0xf4
+        self.pc = np.zeros(n, dtype=np.int64)
+        self.fl = np.zeros(n, dtype=np.uint8)
+        self.interrupts = np.ones(n, dtype=bool)
+        self.halted = np.zeros(n, dtype=bool)
+        self.errors = [None] * n
+        self.output = [[] for _ in range(n)]
+        self.steps = 0
+        self.instructions = 0
+
+    @property
+    def outputs(self) -> list:
+        return [''.join(output) for output in self.output]
+
+    def fail(self, rows: np.ndarray, error: str) -> None:
+        for i in rows:
+            self.errors[i] = error
+        self.halted[rows] = True
+
+    def push(self, rows: np.ndarray, values: np.ndarray) -> None:
+        self.reg[rows, SP] -= 1
+        self.ram[rows, self.reg[rows, SP]] = values
+
+    def pop(self, rows: np.ndarray) -> np.ndarray:
+        values = self.ram[rows, self.reg[rows, SP]]
+        self.reg[rows, SP] += 1
+        return values
+
+    def interrupt(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        """Jump <rows> to the handlers at <vectors>, saving pc, fl and registers 0-6 on the stack."""
+        bad = vectors < 0xf8
+        if bad.any():
+            self.fail(rows[bad], 'Bad interrupt vector')
+            rows, vectors = rows[~bad], vectors[~bad]
+        bits = (vectors - 0xf8).astype(np.uint8)
+        self.reg[rows, IS] &= ~(np.left_shift(1, bits).astype(np.uint8))
+        self.interrupts[rows] = False
+        self.push(rows, self.pc[rows].astype(np.uint8))
+        self.push(rows, self.fl[rows])
+        for i in range(7):
+            self.push(rows, self.reg[rows, i])
+            self.reg[rows, i] = 0
+        self.pc[rows] = self.ram[rows, vectors]
+
+    def check_interrupts(self) -> None:
+        """Raise the lowest pending unmasked interrupt on every machine with interrupts enabled."""
+        pending = self.reg[:, IM] & self.reg[:, IS]
+        rows = np.flatnonzero(self.interrupts & ~self.halted & (pending != 0))
+        if not len(rows):
+            return
+        pending = pending[rows]
+        lowest = np.zeros(len(rows), dtype=np.int64)
+        for bit in range(7, -1, -1):
+            lowest = np.where((pending >> bit) & 1 == 1, bit, lowest)
+        vectors = 0xf8 + lowest
+        self.ram[rows, 0xff] = vectors
+        self.interrupt(rows, vectors)
+
+    def step(self) -> None:
+        """Run one instruction on every machine still running."""
+        self.cycles += 1
+        if self.timer_cycles and self.cycles % self.timer_cycles == 0:
+            # Pending until interrupts are enabled, as on CPU.
+            self.reg[~self.halted, IS] |= 1
+        self.check_interrupts()
+        self.halted |= self.pc >= 256
+        running = np.flatnonzero(~self.halted)
+        if not len(running):
+            return
+        self.steps += 1
+        self.instructions += len(running)
+        opcodes = self.ram[running, self.pc[running]]
+        for opcode in np.unique(opcodes):
+            rows = running[opcodes == opcode]
+            self.execute(int(opcode), rows)
+
+    def execute(self, opcode: int, rows: np.ndarray) -> None:
+        """Apply <opcode> to the machines in <rows>."""
+        operands = opcode >> 6
+        adv_pc = (opcode >> 4) & 1
+        # Copy operands to ram[0xff] and down, as CPU.run does.
+        for k in range(operands):
+            self.pc[rows] += 1
+            self.ram[rows, 0xff - k] = self.ram[rows, np.minimum(self.pc[rows], 255)]
+        if not adv_pc:
+            self.pc[rows] += 1
+        name = MNEMONICS.get(opcode)
+        if name is None or OPERANDS[name] != operands:
+            print(f'Unknown instruction {opcode & 0b1111} on {len(rows)} machines')
+            return
+        a = self.ram[rows, 0xff] & 7
+        b = self.ram[rows, 0xfe] & 7
+        reg = self.reg
+        if name == 'LDI':
+            reg[rows, a] = self.ram[rows, 0xfe]
+        elif name in ALU:
+            x, y = reg[rows, a].astype(np.int64), reg[rows, b].astype(np.int64)
+            if name in ('DIV', 'MOD'):
+                zero = y == 0
+                if zero.any():
+                    self.fail(rows[zero], 'Division by zero')
+                    rows, a, x, y = rows[~zero], a[~zero], x[~zero], y[~zero]
+            reg[rows, a] = ALU[name](x, y) & 0xff
+        elif name == 'INC':
+            reg[rows, a] += 1
+        elif name == 'DEC':
+            reg[rows, a] -= 1
+        elif name == 'NOT':
+            reg[rows, a] = ~reg[rows, a]
+        elif name == 'CMP':
+            x, y = reg[rows, a], reg[rows, b]
+            self.fl[rows] = np.where(x == y, 1, np.where(x > y, 2, 4))
+        elif name in JUMPS:
+            self.pc[rows] = np.where(JUMPS[name](self.fl[rows]), reg[rows, a], self.pc[rows] + 1)
+        elif name == 'JMP':
+            self.pc[rows] = reg[rows, a]
+        elif name == 'LD':
+            reg[rows, a] = self.ram[rows, reg[rows, b]]
+        elif name == 'ST':
+            self.ram[rows, reg[rows, a]] = reg[rows, b]
+        elif name == 'PUSH':
+            self.push(rows, reg[rows, a])
+        elif name == 'POP':
+            reg[rows, a] = self.pop(rows)
+        elif name == 'CALL':
+            self.push(rows, (self.pc[rows] + 1).astype(np.uint8))
+            self.pc[rows] = reg[rows, a]
+        elif name == 'RET':
+            self.pc[rows] = self.pop(rows)
+        elif name == 'INT':
+            self.interrupt(rows, self.ram[rows, 0xff].astype(np.int64))
+        elif name == 'IRET':
+            for i in range(6, -1, -1):
+                reg[rows, i] = self.pop(rows)
+            self.fl[rows] = self.pop(rows)
+            self.pc[rows] = self.pop(rows)
+            self.interrupts[rows] = True
+        elif name in ('PRA', 'PRN'):
+            values = reg[rows, a]
+            for i, value in zip(rows, values):
+                self.output[i].append(chr(value) if name == 'PRA' else str(value))
+        elif name == 'HLT':
+            self.halted[rows] = True
+
+    def run(self, max_steps: int = 100000) -> list:
+        """Step until every machine halts or <max_steps> pass. Return what each printed."""
+        for _ in range(max_steps):
+            if self.halted.all():
+                break
+            self.step()
+        return self.outputs
+
+
+def run_scalar(programs: list) -> list:
+    """Run <programs> one at a time on a CPU, without printing. Return their outputs."""
+    outputs, cpu = [], CPU()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for program in programs:
+            cpu.reset(program)
+            outputs.append(cpu.run())
+    return outputs
+
+
+def sample_programs(n: int, seed: int = 0) -> list:
+    """<n> clue-like programs that print a room number, some after a counting loop."""
+    import random
+    from ls8 import assemble
+    rng = random.Random(seed)
+    programs = []
+    for _ in range(n):
+        text = f'Mine your coin in room {rng.randint(0, 499)}'
+        lines = [f"LDI R0, {rng.randint(1, 30)}", 'LDI R2, Loop', 'LDI R3, 0', 'Loop:', 'DEC R0', 'CMP R0, R3',
+                 'JNE R2']
+        for character in text:
+            lines += [f'LDI R1, {ord(character)}', 'PRA R1']
+        lines.append('HLT')
+        programs.append(assemble('\n'.join(lines)))
+    return programs
+
+
+def benchmark(n: int = 1000) -> dict:
+    """Compare BatchCPU against CPU on <n> sample programs. Both must print the same thing."""
+    programs = sample_programs(n)
+    start = time.perf_counter()
+    scalar = run_scalar(programs)
+    scalar_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    batch = BatchCPU(programs)
+    outputs = batch.run()
+    batch_seconds = time.perf_counter() - start
+    if outputs != scalar:
+        raise AssertionError('BatchCPU output differs from CPU')
+    return {'programs': n,
+            'instructions': batch.instructions,
+            'scalar_seconds': scalar_seconds,
+            'batch_seconds': batch_seconds,
+            'scalar_ips': batch.instructions / scalar_seconds,
+            'batch_ips': batch.instructions / batch_seconds,
+            'speedup': scalar_seconds / batch_seconds}
+
+
+if __name__ == '__main__':
+    print(benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1000))
@@ -0,0 +1,156 @@
+"""Cheap timing histograms for finding where a GamePlayer's wall-clock time goes.
+
+Observations are grouped by category (request, cooldown, proof, clue, route, errand, snitch) and name (endpoint, errand
+place, ...). Recording one costs a perf_counter call, a bisect and a few integer adds, so it stays on in
+production.
+
+    >>> print(game.metrics.summary())
+    >>> game.metrics.to_json()
+    >>> game.metrics.to_prometheus()
+
+Given a path, as in GamePlayer(metrics='metrics.prom'), the histograms are also written there with every periodic
+summary and when auto_play exits. Paths ending in .prom get the Prometheus text format, others JSON.
+"""
+
+import functools
+import json
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds in seconds of each histogram bucket. The last bucket catches everything else.
+BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 25, 60, 120, float('inf'))
+
+
+class Histogram:
+    """Count, total, max and bucketed counts of observed durations."""
+
+    __slots__ = ('count', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS)
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[bisect_left(BUCKETS, seconds)] += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the <q> quantile."""
+        rank, seen = q * self.count, 0
+        for bound, count in zip(BUCKETS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {'count': self.count,
+                'total': self.total,
+                'mean': self.total / self.count if self.count else 0.0,
+                'p50': self.quantile(.5),
+                'p95': self.quantile(.95),
+                'max': self.max}
+
+
+class Metrics:
+    """Histograms keyed by (category, name), with a periodic summary."""
+
+    def __init__(self,
+                 report_every: float = 600,
+                 path: str = None):
+        self.histograms = {}
+        self.report_every = report_every
+        # File to write the histograms to with each summary. None only logs the summary.
+        self.path = path
+        self.last_report = time.perf_counter()
+
+    def observe(self,
+                category: str,
+                name: str,
+                seconds: float) -> None:
+        key = (category, name)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, category: str, name: str):
+        """Time the body of a with block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(category, name, time.perf_counter() - start)
+
+    def summary(self) -> str:
+        """Table of every histogram, categories with the most total time first."""
+        totals = {}
+        for (category, _), histogram in self.histograms.items():
+            totals[category] = totals.get(category, 0) + histogram.total
+        rows = sorted(self.histograms.items(), key=lambda item: (-totals[item[0][0]], -item[1].total))
+        lines = [f'{"category":<10} {"name":<26} {"count":>7} {"total s":>10} {"mean s":>9} '
+                 f'{"p50 s":>8} {"p95 s":>8} {"max s":>9}']
+        for (category, name), histogram in rows:
+            stats = histogram.to_dict()
+            lines.append(f'{category:<10} {name[:26]:<26} {stats["count"]:>7} {stats["total"]:>10.2f} '
+                         f'{stats["mean"]:>9.4f} {stats["p50"]:>8.3f} {stats["p95"]:>8.3f} {stats["max"]:>9.3f}')
+        return '\n'.join(lines)
+
+    def maybe_report(self, log) -> None:
+        """Log the summary to the EventLog <log>, and save, if <report_every> seconds have passed since the last one."""
+        now = time.perf_counter()
+        if now - self.last_report >= self.report_every:
+            self.last_report = now
+            log.info('metrics', summary=self.summary())
+            self.save()
+
+    def save(self) -> None:
+        """Write every histogram to <path>, if there is one. Readers never see a half written file."""
+        if not self.path:
+            return
+        text = self.to_prometheus() if self.path.endswith('.prom') else self.to_json()
+        with open(self.path + '.tmp', 'w') as f:
+            f.write(text)
+        os.replace(self.path + '.tmp', self.path)
+
+    def to_json(self) -> str:
+        return json.dumps([{'category': category, 'name': name, **histogram.to_dict()}
+                           for (category, name), histogram in self.histograms.items()])
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition of every histogram."""
+        lines = ['# TYPE gameplayer_seconds histogram']
+        for (category, name), histogram in self.histograms.items():
+            labels = f'category="{category}",name="{name}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram.buckets):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'gameplayer_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'gameplayer_seconds_sum{{{labels}}} {histogram.total}')
+            lines.append(f'gameplayer_seconds_count{{{labels}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def timed(category: str, name: str = None):
+    """Decorate a GamePlayer method to time each call in the player's metrics."""
+    def decorator(method):
+        label = name or method.__name__
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self.metrics.observe(category, label, time.perf_counter() - start)
+        return wrapper
+    return decorator
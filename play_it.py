@@ -1,13 +1,35 @@
+import atexit
+import itertools
+import os
 import pickle
+import queue
 import random
 import re
-import requests
+import threading
+import time
 from collections import deque
-from cpu import CPU
+from cpu import CPUPool, VirtualClock
 from datetime import datetime
+from events import EventLog
 from hashlib import sha256
+from ls8 import disassemble, parse_text, read_program
+from metrics import Metrics, timed
+from recording import Recorder, Replayer
+from routing import INFINITY, NoRoute, RouteIndex
 
 URL = 'https://lambda-treasure-hunt.herokuapp.com/'
+# Rooms per dimension. Room n + DIMENSION is room n's counterpart in the alternate dimension.
+DIMENSION = 500
+# Player state saved between runs. See save_session.
+SESSION = 'player.pickle'
+# Places a wish's clue moves. Until we wish again, the room we know for them is stale.
+WISHED_FOR = ('mine', 'snitch')
+# The way back through each exit.
+OPPOSITE = {'n': 's', 's': 'n', 'e': 'w', 'w': 'e'}
+# Attributes restored from a saved session.
+SESSION_STATE = ('current_room', 'warped', 'flight', 'dash_', 'warp_', 'name_changed', 'items_', 'places', 'prices',
+                 'strength', 'encumbrance', 'encumbered', 'balance_', 'status_', 'gold', 'snitches', 'bodywear',
+                 'footwear')
 
 
 class GamePlayer:
@@ -18,14 +40,49 @@ class GamePlayer:
     >>> game = GamePlayer()
     >>> game.auto_play()
 
-    See __init__ for important info on initializing player after server disconnect.
+    After the first run, auto_play restores the player from the session saved in player.pickle, so abilities and
+    inventory survive a server disconnect. Delete it, or see __init__, to start from scratch.
     """
 
-    def __init__(self):
+    # Clues waiting to be saved to disc, by one writer thread shared by every player in the process. See queue_clue.
+    clues = queue.Queue()
+    clue_writer = None
+    clue_lock = threading.Lock()
+
+    def __init__(self,
+                 url: str = URL,
+                 record: str = None,
+                 replay: str = None,
+                 seed: int = None,
+                 session: str = SESSION,
+                 proof_pool: str = None,
+                 shared_map: str = None,
+                 metrics: str = None):
+        self.url = url
+        # Read the map from a shared_map file instead of unpickling a copy, if it exists.
+        self.shared_map = shared_map
+        # Address of a proof_pool coordinator to search for proofs with. None searches here alone.
+        self.proof_pool = proof_pool
+        # Where to save player state between runs. None starts from scratch every time. Recordings always start
+        # from scratch, so replays start the same way and never touch a live session.
+        self.session = None if record or replay else session
+        # Seed random room choices to make recorded sessions replay the same way.
+        self.rng = random.Random(seed)
+        # Log every request to <record>, or serve responses from the <replay> log instead of the server.
+        self.recorder = Recorder(record) if record else None
+        self.replayer = Replayer(replay) if replay else None
+        # Time spent per endpoint and phase, written to <metrics> if given. See metrics.py.
+        self.metrics = Metrics(path=metrics)
+        # Warmed up CPUs for decoding clues. Timer interrupts count cycles, not seconds, when headless.
+        self.cpus = CPUPool(clock=VirtualClock)
+        # Console output is queued and written by a background thread. See events.py.
+        self.log = EventLog()
         self.key = '1e255e28b47f9ce58a5d14a5a6d48ea7fa6e2599'
         self.auth = {"Authorization": f"Token {self.key}",
                      "Content-Type": "application/json"}
         self.cooldown = 0
+        # Seconds to wait past each cooldown, in case our clock runs ahead of the server's.
+        self.cooldown_margin = .1
         self.world = {}
         self.current_room = None
         self.then = datetime.now()
@@ -39,13 +96,15 @@ class GamePlayer:
         self.bodywear = None
         self.footwear = None
         self.warped = False
-        # Ensure the following variables match server state after a connection loss.
+        # Ensure the following variables match server state when starting without a saved session.
         # They are not updated with calls to self.status or initialize_player.
         self.flight = True
         self.dash_ = True
         self.warp_ = True
         self.name_changed = True
         self.items_ = deque()
+        # {item name: {'itemtype', 'weight', 'price'}} from the shop's quotes.
+        self.prices = {}
         self.places = {'shop': {'room_id': 1},
                        'flight': {'room_id': 22},
                        'dash': {'room_id': 461},
@@ -54,7 +113,13 @@ class GamePlayer:
                        'pirate': {'room_id': 467},  # Name change
                        'well': {'room_id': 55},
                        'warp': {'room_id': None},
-                       'warp_well': {'room_id': 555}}
+                       'warp_well': {'room_id': 555},
+                       'snitch': {'room_id': None}}
+        # Cooldown of a warp, in moves, for routing across dimensions.
+        self.warp_cost = 1
+        # Shortest paths, kept up to date as the map changes. See routing.py.
+        self.routes = RouteIndex(self.edges)
+        self.routes_key = None
 
     def make_request(self,
                      suffix: str,
@@ -62,17 +127,36 @@ class GamePlayer:
                      header: dict = None,
                      http: str = None) -> dict:
         """Make API request to game server, return dict response."""
-        # Wait for cooldown period to expire.
-        while (datetime.now() - self.then).seconds < self.cooldown + .1:
+        if self.replayer:
+            # Recorded responses are served without the network or cooldown waits.
+            response = self.replayer.next(http, suffix, data)
+            self.handle_response(response)
+            return response
+        endpoint = suffix.strip('/')[len('api/'):]
+        # Wait for cooldown period to expire. Sleep through most of it, leaving the CPU to background work, then spin
+        # so the request goes out as soon as it ends.
+        waiting = time.perf_counter()
+        remaining = self.cooldown + self.cooldown_margin - (datetime.now() - self.then).total_seconds()
+        if remaining > .02:
+            time.sleep(remaining - .02)
+        while (datetime.now() - self.then).total_seconds() < self.cooldown + self.cooldown_margin:
             pass
+        sent, start = time.time(), time.perf_counter()
+        self.metrics.observe('cooldown', endpoint, start - waiting)
+        # Imported here, as it's slow to import and commands that never touch the network shouldn't pay for it.
+        import requests
         try:
             if http == 'get':
-                response = requests.get(URL + suffix, headers=header, data=data)
+                response = requests.get(self.url + suffix, headers=header, data=data)
             elif http == 'post':
-                response = requests.post(URL + suffix, headers=header, json=data)
+                response = requests.post(self.url + suffix, headers=header, json=data)
         except response.raise_for_status():  # Raise for 4xx or 5xx response.
             self.auto_play()
         response = response.json()
+        latency = time.perf_counter() - start
+        self.metrics.observe('request', endpoint, latency)
+        if self.recorder:
+            self.recorder.write(http, suffix, data, response, sent, latency)
         self.handle_response(response)
         self.then = datetime.now()  # Reset timer.
         return response
@@ -83,10 +167,10 @@ class GamePlayer:
             self.cooldown = float(response['cooldown'])
         if 'errors' in response:
             if response['errors']:
-                print(f'\nError: {response["errors"]}')
+                self.log.warning('errors', errors=response['errors'])
         if 'messages' in response:
             if response['messages']:
-                print(f'\n{" ".join(response["messages"])}')
+                self.log.info('messages', messages=response['messages'])
 
     def initialize_player(self) -> None:
         """Create player in server database and initialize world map."""
@@ -95,30 +179,102 @@ class GamePlayer:
         self.current_room = new_room['room_id']
         # If current room hasn't been saved to self.world, do that.
         if self.current_room not in self.world:
-            self.world[self.current_room] = {'meta': new_room,
-                                             'to_n': None,
-                                             'to_w': None,
-                                             'to_s': None,
-                                             'to_e': None}
+            try:
+                self.world[self.current_room] = {'meta': new_room,
+                                                 'to_n': None,
+                                                 'to_w': None,
+                                                 'to_s': None,
+                                                 'to_e': None}
+                self.routes.sync([self.current_room])
+            except PermissionError:
+                # Another player writes the shared map, and will add the room when it gets here.
+                self.log.warning('note', text=f'\nRoom {self.current_room} is not on the shared map yet.')
         self.status()
         self.balance()
         self.find_items(new_room)
         self.print_status_info(new_room)
+        self.save_session()
         return
 
+    def save_session(self) -> None:
+        """Save player state and the cooldown deadline to the session file."""
+        if not self.session:
+            return
+        path = self.session
+        remaining = self.cooldown - (datetime.now() - self.then).total_seconds()
+        session = {'key': self.key,
+                   'cooldown_until': time.time() + max(remaining, 0),
+                   **{name: getattr(self, name) for name in SESSION_STATE}}
+        # Write then rename, so a crash mid-save never leaves a broken session behind.
+        with open(f'{path}.tmp', 'wb') as f:
+            pickle.dump(session, f)
+        os.replace(f'{path}.tmp', path)
+
+    def load_session(self) -> bool:
+        """Restore player state from the session file and check it with one init request.
+
+        Return False if there is no usable session, in which case initialize_player is needed.
+        """
+        if not self.session:
+            return False
+        try:
+            with open(self.session, 'rb') as f:
+                session = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return False
+        if session.get('key') != self.key:
+            return False
+        for name in SESSION_STATE:
+            setattr(self, name, session[name])
+        # Honor the cooldown left over from the last run.
+        self.then = datetime.now()
+        self.cooldown = max(session['cooldown_until'] - time.time(), 0)
+        header = {"Authorization": f"Token {self.key}"}
+        new_room = self.make_request(suffix='api/adv/init/', header=header, http='get')
+        if 'room_id' not in new_room:
+            return False
+        if new_room['room_id'] != self.current_room:
+            self.log.warning('note', text=f'\nSaved in room {self.current_room}, but in room {new_room["room_id"]}.')
+            self.current_room = new_room['room_id']
+            self.warped = self.current_room >= DIMENSION
+        self.print_status_info(new_room)
+        return True
+
     def load_map(self) -> None:
         """Load a map if one exists, otherwise, build one."""
-        print('\nChecking if map saved...')
+        self.log.info('note', text='\nChecking if map saved...')
+        if self.shared_map:
+            from shared_map import SharedWorld
+            if not os.path.exists(self.shared_map):
+                self.publish_map()
+            self.world = SharedWorld(self.shared_map)
+            # The first player on the map writes the rooms every player finds. The rest read, until the writer exits.
+            role = 'writing' if self.world.claim() else 'reading'
+            self.log.info('note', text=f'Map shared! {role.capitalize()} it.\n')
+            return
         try:
             with open('world.pickle', 'rb') as f:
                 self.world = pickle.load(f)
-            print('Map complete!\n')
+            self.log.info('note', text='Map complete!\n')
         except FileNotFoundError:
             self._traverse_map()
 
+    def publish_map(self) -> None:
+        """Create the shared map file from world.pickle, or empty to be filled in as we explore."""
+        from shared_map import SharedWorld
+        try:
+            with open('world.pickle', 'rb') as f:
+                world = pickle.load(f)
+        except FileNotFoundError:
+            world = {}
+        # Write a new file and swap it in, so other players never map a half written one.
+        SharedWorld.create(f'{self.shared_map}.tmp', world).close()
+        os.replace(f'{self.shared_map}.tmp', self.shared_map)
+        self.log.info('note', text=f'\nShared {len(world)} rooms at {self.shared_map}.')
+
     def _traverse_map(self) -> None:
         """Do a DFS to dead-end, BFS to a room with an unexplored exit to create world map. Save map to disc."""
-        print('\nBuilding map...')
+        self.log.info('note', text='\nBuilding map...')
         while True:
             # Move to a dead-end.
             self.DFS_DE()
@@ -126,14 +282,15 @@ class GamePlayer:
             more_to_explore = self.BFS_UE()
             # If none exist, we have traversed to every room.
             if not more_to_explore:
-                print('Map complete!\n')
-                # Save the map.
-                with open('world.pickle', 'wb') as f:
-                    pickle.dump(self.world, f)
+                self.log.info('note', text='Map complete!\n')
+                # Save the map. A shared map is saved as it's written.
+                if not self.shared_map:
+                    with open('world.pickle', 'wb') as f:
+                        pickle.dump(self.world, f)
                 return
             # Move along path to room with an unexplored exit.
             self.take_path(more_to_explore)
-            print(f'{len(self.world)} rooms found!')
+            self.log.info('note', text=f'{len(self.world)} rooms found!')
 
     def get_exits(self, room: int) -> list:
         """Return list of all exits from <room>."""
@@ -165,7 +322,6 @@ class GamePlayer:
 
     def DFS_DE(self) -> None:
         """Take first available unexplored exit until current room contains no unexplored exits."""
-        rev_dir = {'n': 's', 'w': 'e', 's': 'n', 'e': 'w'}
         while True:
             exits = self.get_exits(self.current_room)
             # If we've explored all exits, return.
@@ -178,59 +334,70 @@ class GamePlayer:
             fly = False
             if self.flight and self.world[self.current_room]['meta']['terrain'] != "CAVE":
                 fly = True
+            # Moving marks the new room and the connections both ways on our map.
             new_room = self.move(open_exit, fly=fly)
             new_room_id = int(new_room['room_id'])
-            # Mark new rooms and connections on our map.
-            if new_room_id not in self.world:
-                self.world[new_room_id] = {'meta': new_room,
-                                           'to_n': None,
-                                           'to_w': None,
-                                           'to_s': None,
-                                           'to_e': None}
-            self.world[self.current_room][f'to_{open_exit}'] = new_room_id
-            self.world[new_room_id][f'to_{rev_dir[open_exit]}'] = self.current_room
             # Mark all non-exits.
             for exit_ in ['n', 'w', 's', 'e']:
                 if exit_ not in exits:
                     self.world[self.current_room][f'to_{exit_}'] = False
+            self.routes.sync([self.current_room])
             # Update our current place in the map.
             self.current_room = new_room_id
 
-    def find_path(self, target: int) -> list:
-        """Create a path to a <target> room with BFS."""
-        if self.current_room == target:
+    def counterpart(self, room: int) -> int:
+        """The room at the same place in the other dimension."""
+        return room + DIMENSION if room < DIMENSION else room - DIMENSION
+
+    def edges(self, room: int):
+        """Yield (next room, direction, cost in moves) for every way out of <room>, warping included once able."""
+        for exit_ in self.get_exits(room):
+            yield self.world[room][f'to_{exit_}'], exit_, 1
+        if self.warp_ and self.counterpart(room) in self.world:
+            yield self.counterpart(room), 'warp', self.warp_cost
+
+    @timed('route', 'find_path')
+    def find_path(self,
+                  target: int,
+                  start: int = None) -> list:
+        """Create the cheapest path to a <target> room. Start from the current room unless given a <start>.
+
+        Both dimensions are one graph, so a path may warp across and back when that beats walking. Paths come from
+        a RouteIndex, which is only patched where the map changed. Raise NoRoute if the map has no way there.
+        """
+        if start is None:
+            start = self.current_room
+        if start == target:
             return []
-        visited = set()
-        path = [(self.current_room, '')]
-        queue = deque()
-        queue.append(path)
-        while queue:
-            # Get the last room in the next path from queue.
-            path = queue.popleft()
-            room = path[-1][0]
-            # Move along if we've seen this room before.
-            if room not in visited:
-                visited.add(room)
-                exits = self.get_exits(room)
-                for exit_ in exits:
-                    # Make a new path to each exit.
-                    new_room = self.world[room][f'to_{exit_}']
-                    new_path = [*path, (new_room, exit_)]
-                    # Stop when finding our target room.
-                    if new_room == target:
-                        return new_path[1:]
-                    queue.append(new_path)
+        # Catch up with a new map, new abilities or rooms another process found.
+        key = (id(self.world), getattr(self.world, 'version', None), self.warp_, self.warp_cost)
+        if key != self.routes_key:
+            self.routes.sync(set(self.world) | set(self.routes.out))
+            self.routes_key = key
+        path = self.routes.path(start, target)
+        if path is None:
+            raise NoRoute(f'No known path from room {start} to room {target}')
+        return path
 
-    def take_path(self, path: list) -> None:
-        """Move along the <path>. Fly if able."""
-        for next_room in path:
+    def take_path(self,
+                  path: list,
+                  look: bool = True) -> None:
+        """Move along the <path>. Fly if able.
+
+        If <look>ing, check each room for items, except rooms of the alternate dimension we only pass through.
+        """
+        for i, next_room in enumerate(path):
             room = next_room[0]
             direction = next_room[1]
+            if direction == 'warp':
+                self.warp()
+                continue
             # Don't fly in caves!
             fly = False
             if self.flight and self.world[room]['meta']['terrain'] != 'CAVE':
                 fly = True
-            new_room = self.move(direction, room=room, fly=fly)
+            passing_through = self.warped and i < len(path) - 1
+            new_room = self.move(direction, room=room, fly=fly, look=look and not passing_through)
             self.current_room = int(new_room['room_id'])
 
     def save_place(self, room: dict) -> None:
@@ -238,14 +405,15 @@ class GamePlayer:
         title = room['title'].lower()
         for place in self.places:
             if place in title:
-                print(f'Added a place: {place} at {int(room["room_id"])}')
+                self.log.info('note', text=f'Added a place: {place} at {int(room["room_id"])}')
                 self.places[place] = room
 
     def move(self,
              direction: str,
              room: int = None,
-             fly: bool = False) -> dict:
-        """Move player in the given <direction>. Fly if able."""
+             fly: bool = False,
+             look: bool = True) -> dict:
+        """Move player in the given <direction>. Fly if able. Check the new room for items if <look>ing."""
         if room is not None:
             # Get 'wise explorer' cooldown bonus by supplying a <room>.
             data = {"direction": f'{direction}', "next_room_id": f"{room}"}
@@ -255,186 +423,415 @@ class GamePlayer:
         if fly:
             suffix = 'api/adv/fly/'
         new_room = self.make_request(suffix=suffix, header=self.auth, data=data, http='post')
+        self.record_move(direction, new_room)
         self.print_status_info(new_room)
         # self.save_place(new_room)
-        self.find_items(new_room)
+        if look:
+            self.find_items(new_room)
         return new_room
 
+    def record_move(self,
+                    direction: str,
+                    new_room: dict) -> None:
+        """Mark <new_room>, reached from the current room in <direction>, and the connections both ways on our map.
+
+        Only what's new is written, as every write to a shared map makes its players catch up. A player reading
+        a shared map leaves writing to the writer.
+        """
+        room = self.current_room
+        if new_room.get('errors') or 'room_id' not in new_room or room not in self.world:
+            return
+        new_room_id = int(new_room['room_id'])
+        if new_room_id == room:
+            return
+        try:
+            if new_room_id not in self.world:
+                self.world[new_room_id] = {'meta': new_room,
+                                           'to_n': None,
+                                           'to_w': None,
+                                           'to_s': None,
+                                           'to_e': None}
+            if self.world[room][f'to_{direction}'] != new_room_id:
+                self.world[room][f'to_{direction}'] = new_room_id
+            if self.world[new_room_id][f'to_{OPPOSITE[direction]}'] is None:
+                self.world[new_room_id][f'to_{OPPOSITE[direction]}'] = room
+        except PermissionError:
+            return
+        self.routes.sync([room, new_room_id])
+
     def find_items(self, new_room: dict) -> None:
-        """Pick up items if we can."""
-        if new_room['items'] and not self.encumbered:
+        """Pick up items if we can. Treasure in the room is weighed against what we carry all at once."""
+        if new_room.get('items') and not self.encumbered:
+            sighted = []
             for item in new_room['items']:
-                self.take(item)
+                if self.warped:
+                    self.take(item)
+                    continue
+                item_ = self.examine(item)
+                if item_['itemtype'] == 'TREASURE':
+                    sighted.append(item_)
+                else:
+                    self.take_wearable(item_)
+            if sighted:
+                self.pick_treasure(sighted)
 
     def print_status_info(self, current_room: dict) -> None:
-        """Print out info about player and <current room>."""
-        print(f'\nIn room {current_room["room_id"]}. \nCurrent cooldown: {self.cooldown}'
-              f'\nInventory: {", ".join([item["name"][:-9] for item in self.items_]) if self.items_ else "None"} '
-              f'\nPlayers in room: {", ".join(current_room["players"]) if current_room["players"] else "None"} '
-              f'\nGold: {self.gold}, Lambda Coins: {self.balance_}, Snitches: {self.snitches}'
-              f'\nEncumbrance: {self.encumbrance}, Strength: {self.strength}')
+        """Log info about player and <current room>. Rendering happens on the log's writer thread."""
+        self.log.info('status',
+                      room_id=current_room['room_id'],
+                      cooldown=self.cooldown,
+                      inventory=[item['name'] for item in self.items_],
+                      players=current_room['players'],
+                      gold=self.gold,
+                      coins=self.balance_,
+                      snitches=self.snitches,
+                      encumbrance=self.encumbrance,
+                      strength=self.strength)
 
     def auto_play(self) -> None:
-        """Helper function for starting game."""
-        self.load_map()
-        self.initialize_player()
-        self.play()
+        """Helper function for starting game. Resume a saved session if there is one. Save the metrics however
+        it ends.
+        """
+        try:
+            if not self.world:
+                self.load_map()
+            if not self.load_session():
+                self.initialize_player()
+            # Finish a shared map that's missing rooms, so every player can route through them.
+            if self.shared_map and self.world.writable and self.unexplored():
+                self._traverse_map()
+            self.play()
+        finally:
+            self.metrics.save()
 
-    def sell_things(self) -> None:
-        """Move to the shop and sell all the treasure."""
-        print('\nGoing to sell this treasure...')
-        path = self.find_path(int(self.places['shop']['room_id']))
+    def unexplored(self) -> bool:
+        """Whether any room on the map has an exit we haven't been through."""
+        return any(self.world[room][f'to_{exit_}'] is None for room in self.world for exit_ in self.get_exits(room))
+
+    def go_to(self,
+              room: int,
+              look: bool = True) -> None:
+        """Travel to <room>. Dash if able. Unless <look>ing, skip checking for items and status on arrival.
+
+        Stay put if the map has no way there.
+        """
+        try:
+            path = self.find_path(int(room))
+        except NoRoute as error:
+            self.log.warning('note', text=f'\n{error}. Staying in room {self.current_room}.')
+            return
         if self.dash_:
-            self.dash(path)
+            self.dash(path, look)
         else:
-            self.take_path(path)
-        print('\nGot to the shop.')
+            self.take_path(path, look)
+
+    def travel_cost(self, path: list) -> int:
+        """Estimate the number of cooldowns needed to travel <path>.
+
+        Straight runs of 3 or more rooms cost one dash when we can dash, everything else costs a move per room or
+        warp.
+        """
+        if not self.dash_:
+            return len(path)
+        cost, run, last_direction = 0, 0, None
+        for _, direction in [*path, (None, None)]:
+            if direction == last_direction:
+                run += 1
+                continue
+            cost += 1 if run > 2 and last_direction != 'warp' else run
+            run, last_direction = 1, direction
+        return cost
+
+    def sell_things(self) -> None:
+        """Move to the shop and sell all the treasure."""
+        self.log.info('note', text='\nGoing to sell this treasure...')
+        self.go_to(self.places['shop']['room_id'])
+        self.log.info('note', text='\nGot to the shop.')
+        self.at_shop()
+
+    def at_shop(self) -> None:
+        """Sell all the treasure."""
         self.sell()
         self.status()
 
+    @timed('errand', 'wander')
     def rand_room(self) -> None:
-        """Go to a random room."""
-        start, end = 0, 499
-        if self.warped:
-            start, end = 500, 999
-        rand_room = random.randint(start, end)
-        print(f'\nGoing to room {rand_room}...')
-        path = self.find_path(rand_room)
+        """Go to a random room in the first dimension, where the treasure is."""
+        rand_room = self.rng.randint(0, DIMENSION - 1)
+        self.log.info('note', text=f'\nGoing to room {rand_room}...')
+        try:
+            path = self.find_path(rand_room)
+        except NoRoute:
+            # Not on our part of the map yet.
+            return
         self.take_path(path)
-        print(f'\nGot to room {rand_room}.')
+        self.log.info('note', text=f'\nGot to room {rand_room}.')
 
     def name_change(self) -> None:
         """Go to the name changing pirate and get your true name."""
-        print('\nGoing to pirate...')
+        self.log.info('note', text='\nGoing to pirate...')
         path = self.find_path(int(self.places['pirate']['room_id']))
         self.take_path(path)
-        print('\nGot to pirate.')
+        self.log.info('note', text='\nGot to pirate.')
+        self.at_pirate()
+
+    def at_pirate(self) -> None:
+        """Get your true name from the pirate."""
         self.change_name()
         self.name_changed = True
         self.status()
 
     def to_dash(self) -> None:
         """Go to the dash shrine and pray."""
-        print('\nGoing to dash...')
+        self.log.info('note', text='\nGoing to dash...')
         path = self.find_path(int(self.places['dash']['room_id']))
         self.take_path(path)
-        print(f'\nGot to dash.')
-        self.pray()
-        self.dash_ = True
-        self.status()
+        self.log.info('note', text=f'\nGot to dash.')
+        self.at_shrine('dash')
 
     def to_flight(self) -> None:
         """Go to the flight shrine and pray."""
-        print('\nGoing to flight...')
+        self.log.info('note', text='\nGoing to flight...')
         path = self.find_path(int(self.places['flight']['room_id']))
         self.take_path(path)
-        print(f'\nGot to flight.')
-        self.pray()
-        self.flight = True
-        self.status()
+        self.log.info('note', text=f'\nGot to flight.')
+        self.at_shrine('flight')
 
     def to_warp(self) -> None:
         """Go to the warp shrine and pray."""
-        print('\nGoing to warp...')
+        self.log.info('note', text='\nGoing to warp...')
         path = self.find_path(self.places['warp']['room_id'])
         self.dash(path)
-        print('\nGot to warp shrine.')
+        self.log.info('note', text='\nGot to warp shrine.')
+        self.at_shrine('warp')
+
+    def at_shrine(self, shrine: str) -> None:
+        """Pray at the <shrine> and mark its ability as earned."""
         self.pray()
-        self.warp_ = True
+        ability = {'dash': 'dash_', 'flight': 'flight', 'warp': 'warp_'}[shrine]
+        setattr(self, ability, True)
         self.status()
 
     def dimensional_traveler(self) -> None:
-        """Warp to alternate dimension, find well, decode clue, go grab snitch, warp back to reality."""
-        print('\nWarping...')
-        self.warp()
-        # Make sure self.current_room is correct.
-        self.initialize_player()
-        print('\nGoing to well...\n')
-        path = self.find_path(self.places['warp_well']['room_id'])
-        self.dash(path)
-        print('\nWishing...')
+        """Wish at the well in the alternate dimension, then race to the snitch. Warps are part of the route.
+
+        Other players race us for snitches, so everything between wishing and taking is planned inside the wish's
+        cooldown: the clue is decoded in memory and the route worked out, and the first dash goes out as soon as the
+        cooldown ends. Nothing looks around on the way. Time from wishing to taking is kept in metrics.
+        """
+        self.log.info('note', text='\nGoing to well...\n')
+        self.go_to(self.places['warp_well']['room_id'], look=False)
+        self.log.info('note', text='\nWishing...')
+        wished = time.perf_counter()
         self.wish()
-        print('\nGoing to snitch...')
-        path = self.find_path(int(self.places['mine']['room_id']))
-        self.dash(path)
-        self.take('golden snitch')
-        self.warp()
-        self.initialize_player()
+        path = self.find_path(int(self.places['snitch']['room_id']))
+        # Cooldown still left once the route is planned. Below zero, planning held up the run.
+        slack = self.cooldown + self.cooldown_margin - (datetime.now() - self.then).total_seconds()
+        self.log.info('note', text='\nGoing to snitch...')
+        if self.dash_:
+            self.dash(path, look=False)
+        else:
+            self.take_path(path, look=False)
+        response = self.grab_snitch()
+        seconds = time.perf_counter() - wished
+        self.metrics.observe('snitch', 'wish_to_snitch', seconds)
+        self.log.info('snitch', room_id=self.current_room, seconds=round(seconds, 3), slack=round(slack, 3),
+                      taken=not response.get('errors'))
+        self.status()
+
+    def grab_snitch(self) -> dict:
+        """Take the golden snitch."""
+        suffix = 'api/adv/take/'
+        data = {"name": 'golden snitch'}
+        return self.make_request(suffix=suffix, data=data, header=self.auth, http='post')
 
     def coin_dash(self) -> None:
-        """Dash to the well, then the mine, mine a coin."""
-        print('\nGoing to wishing well...\n')
-        path = self.find_path(int(self.places['well']['room_id']))
-        self.dash(path)
-        print('\nGot to the wishing well.')
+        """Dash to the well, then the mine, mine a coin.
+
+        Like the snitch run, the clue is decoded and the route to the mine planned inside the wish's cooldown, and
+        nothing looks around on the way.
+        """
+        self.log.info('note', text='\nGoing to wishing well...\n')
+        self.go_to(self.places['well']['room_id'], look=False)
+        self.log.info('note', text='\nGot to the wishing well.')
+        wished = time.perf_counter()
         self.wish()
-        print('\nGoing to the mine...')
-        path = self.find_path(int(self.places['mine']['room_id']))
-        self.dash(path)
-        print('\nGot to the mine.')
+        self.log.info('note', text='\nGoing to the mine...')
+        self.go_to(self.places['mine']['room_id'], look=False)
+        self.metrics.observe('errand', 'wish_to_mine', time.perf_counter() - wished)
+        self.log.info('note', text='\nGot to the mine.')
         self.proof()
 
+    def errands(self) -> list:
+        """Collect the errands whose preconditions are met.
+
+        An errand is a list of (place, action) stops visited in order. A place of None means act where we stand.
+        """
+        errands = []
+        # Change name if not already done.
+        if self.places['pirate']['room_id'] and not self.name_changed and self.gold >= 1000:
+            errands.append([('pirate', self.at_pirate)])
+        # Pray at each shrine once.
+        for shrine, ability in [('dash', 'dash_'), ('flight', 'flight'), ('warp', 'warp_')]:
+            if self.places[shrine]['room_id'] and self.name_changed and not getattr(self, ability):
+                errands.append([(shrine, lambda shrine=shrine: self.at_shrine(shrine))])
+        # Sell treasure.
+        if self.encumbered and self.places['shop']['room_id']:
+            errands.append([('shop', self.at_shop)])
+        # Go get a golden snitch.
+        if self.encumbered and self.warp_:
+            errands.append([('warp_well', self.dimensional_traveler)])
+        # Mine a lambda coin. The mine is only known once we've wished.
+        if self.encumbered and self.places['well']['room_id'] and self.name_changed:
+            errands.append([('well', self.wish), ('mine', self.proof)])
+        return errands
+
+    def schedule_errands(self, errands: list) -> list:
+        """Order <errands> to minimize the total estimated cooldown of visiting all their stops.
+
+        There are only a handful of errands, so try every order. Paths between stops are cached.
+        """
+        costs = {}
+
+        def cost(start: int, target: int) -> int:
+            if (start, target) not in costs:
+                try:
+                    costs[(start, target)] = self.travel_cost(self.find_path(target, start=start))
+                except NoRoute:
+                    costs[(start, target)] = INFINITY
+            return costs[(start, target)]
+
+        best, best_cost = errands, None
+        for order in itertools.permutations(errands):
+            total, room = 0, self.current_room
+            for place, _ in itertools.chain(*order):
+                target = self.places[place]['room_id'] if place else None
+                # Stops we can't locate yet, like a mine the next wish will name, don't move us on the estimate.
+                if target is None or place in WISHED_FOR:
+                    continue
+                total += cost(room, int(target))
+                room = int(target)
+                if best_cost is not None and total >= best_cost:
+                    break
+            if best_cost is None or total < best_cost:
+                best, best_cost = list(order), total
+        return best
+
+    def run_errands(self, errands: list) -> None:
+        """Visit every stop of the scheduled <errands> in one tour."""
+        for place, action in itertools.chain(*self.schedule_errands(errands)):
+            with self.metrics.timer('errand', place or action.__name__):
+                if place:
+                    self.log.info('note', text=f'\nGoing to {place}...')
+                    self.go_to(self.places[place]['room_id'])
+                    self.log.info('note', text=f'\nGot to {place}.')
+                action()
+
     def play(self) -> None:
-        """Go to random rooms to find treasure, sell when encumbered, pray if able, mine coins, find snitches.
+        """Go to random rooms to find treasure, run errands when able, selling, praying, mining and snitching
+        in one tour.
 
          Do it forever.
          """
         while True:
-            # Change name if not already done.
-            if self.places['pirate']['room_id'] and not self.name_changed and self.gold >= 1000:
-                self.name_change()
-            # Pray at the dash shrine once.
-            if self.places['dash']['room_id'] and self.name_changed and not self.dash_:
-                self.to_dash()
-            # Pray at the flight shrine once.
-            if self.places['flight']['room_id'] and self.name_changed and not self.flight:
-                self.to_flight()
-            # Pray at the warp shrine once.
-            if self.places['warp']['room_id'] and self.name_changed and not self.warp:
-                self.to_warp()
-            # Do every loop:
-            # Sell treasure.
-            if self.encumbered and self.places['shop']['room_id']:
-                self.sell_things()
+            # Sell, pray, mine and find snitches in the cheapest order.
+            errands = self.errands()
+            if errands:
+                self.run_errands(errands)
             # Go to random rooms to collect treasure until you can carry no more.
             if not self.encumbered:
                 self.rand_room()
-            # Go get a golden snitch.
-            if self.encumbered and self.warp_:
-                self.dimensional_traveler()
-            # Mine lambda a coin.
-            if self.encumbered and self.places['well']['room_id'] and self.name_changed:
-                self.coin_dash()
+            self.save_session()
+            self.metrics.maybe_report(self.log)
 
     def take(self, item: str) -> None:
         """Take <item> from current room if weight limit won't be exceeded."""
-        print(f'\nYou found {item}')
+        self.log.info('note', text=f'\nYou found {item}')
         # Only get snitches in alternate dimension.
         if self.warped:
-            suffix = 'api/adv/take/'
-            data = {"name": 'golden snitch'}
-            self.make_request(suffix=suffix, data=data, header=self.auth, http='post')
+            self.grab_snitch()
         if not self.warped:
             # Get item dict and attributes.
             item_ = self.examine(item)
-            item_weight = int(item_['weight'])
-            item_type = item_['itemtype']
-            if item_type == 'TREASURE':
-                # Make sure item doesn't exceed weight limit.
-                if self.encumbrance + item_weight < self.strength:
-                    self.take_n_wear(item_)
-            elif item_type != 'TREASURE':
-                if item_type == 'FOOTWEAR':
-                    if not self.footwear:
-                        self.take_n_wear(item_, wear=True)
-                    # Make sure item doesn't exceed weight limit.
-                    elif self.footwear and (self.encumbrance + (item_weight - self.footwear['weight']) < self.strength):
-                        self.take_n_wear(item_, wear=True)
-                if item_type == 'BODYWEAR':
-                    if not self.bodywear:
-                        self.take_n_wear(item_, wear=True)
-                    elif self.bodywear and (self.encumbrance + (item_weight - self.bodywear['weight']) < self.strength):
-                        self.take_n_wear(item_, wear=True)
+            if item_['itemtype'] == 'TREASURE':
+                self.pick_treasure([item_])
+            else:
+                self.take_wearable(item_)
+
+    def take_wearable(self, item: dict) -> None:
+        """Take and wear <item> if it won't exceed the weight limit."""
+        item_weight = int(item['weight'])
+        item_type = item['itemtype']
+        if item_type == 'FOOTWEAR':
+            if not self.footwear:
+                self.take_n_wear(item, wear=True)
+            # Make sure item doesn't exceed weight limit.
+            elif self.footwear and (self.encumbrance + (item_weight - self.footwear['weight']) < self.strength):
+                self.take_n_wear(item, wear=True)
+        if item_type == 'BODYWEAR':
+            if not self.bodywear:
+                self.take_n_wear(item, wear=True)
+            elif self.bodywear and (self.encumbrance + (item_weight - self.bodywear['weight']) < self.strength):
+                self.take_n_wear(item, wear=True)
+
+    def pick_treasure(self, sighted: list) -> None:
+        """Carry the most valuable mix of the treasure we carry and the <sighted> treasure in this room.
+
+        Drop carried treasure that a better find pushes out, but only when the gain is worth the extra cooldowns of
+        dropping and taking. Skip finds that aren't worth the space.
+        """
+        carried = [item for item in self.items_ if item['itemtype'] == 'TREASURE']
+        carried_weight = sum(int(item['weight']) for item in carried)
+        # Keep total weight under strength, as before, after what we wear.
+        capacity = self.strength - 1 - (self.encumbrance - carried_weight)
+        if capacity <= 0:
+            # What we wear already fills us up. Take nothing new, and keep what we carry for the shop.
+            return
+        candidates = carried + sighted
+        weights = [int(item['weight']) for item in candidates]
+        values = []
+        for item in candidates:
+            value = self.item_value(item)
+            # Before our first sale every treasure is worth its weight.
+            values.append(int(item['weight']) if value is None else value)
+        held = set(range(len(carried)))
+        # Either keep all we carry and take what fits beside it, or swap for the best mix overall.
+        keep = held | {len(carried) + i for i in self.knapsack(weights[len(carried):], values[len(carried):],
+                                                               capacity - carried_weight)}
+        swap = self.knapsack(weights, values, capacity)
+        # Every drop and take costs a cooldown, worth a unit of capacity at the candidates' average value per weight.
+        cooldowns = len(held - swap) + len(swap - held) - len(keep - held)
+        gain = sum(values[i] for i in swap) - sum(values[i] for i in keep)
+        chosen = swap if gain > cooldowns * sum(values) / sum(weights) else keep
+        for i, item in enumerate(carried):
+            if i not in chosen:
+                self.log.info('note', text=f'Dropping {item["name"]} to make room.')
+                self.drop(item['name'])
+        for i, item in enumerate(sighted, start=len(carried)):
+            if i in chosen:
+                self.take_n_wear(item)
+
+    @staticmethod
+    def knapsack(weights: list,
+                 values: list,
+                 capacity: int) -> set:
+        """Solve the 0/1 knapsack. Return the indices of the most valuable items fitting in <capacity>."""
+        if capacity <= 0:
+            return set()
+        best = [0.0] * (capacity + 1)
+        keep = [[False] * (capacity + 1) for _ in weights]
+        for i, (weight, value) in enumerate(zip(weights, values)):
+            for room in range(capacity, weight - 1, -1):
+                if best[room - weight] + value > best[room]:
+                    best[room] = best[room - weight] + value
+                    keep[i][room] = True
+        # Walk back through the table to find the chosen items.
+        chosen, room = set(), capacity
+        for i in range(len(weights) - 1, -1, -1):
+            if keep[i][room]:
+                chosen.add(i)
+                room -= weights[i]
+        return chosen
 
     def take_n_wear(self,
                     item: dict,
@@ -460,7 +857,7 @@ class GamePlayer:
 
     def check_fit(self, item: dict) -> dict:
         """Put on an <item> if it makes sense to."""
-        print(f'Seeing if {item["name"]} will fit.')
+        self.log.info('note', text=f'Seeing if {item["name"]} will fit.')
         if 'FOOTWEAR' in item['itemtype']:
             curr_item = self.footwear
         elif 'BODYWEAR' in item['itemtype']:
@@ -510,30 +907,59 @@ class GamePlayer:
         suffix = 'api/adv/drop/'
         data = {"name": item}
         response = self.make_request(suffix=suffix, data=data, header=self.auth, http='post')
-        # Remove item from inventory.
-        while any([item_['name'] == item for item_ in self.items_]):
-            thing = self.items_.popleft()
-            if thing['name'] == item:
-                continue
-            else:
-                self.items_.append(thing)
+        # Remove one of the item from inventory, the server only drops one.
+        for item_ in self.items_:
+            if item_['name'] == item:
+                self.items_.remove(item_)
+                self.encumbrance -= int(item_['weight'])
+                break
         return response
 
     def sell(self) -> None:
-        """Sell all of the treasure items, keep the rest."""
+        """Sell all of the treasure items, keep the rest.
+
+        Items already in the price book skip the quote and go straight to confirming the sale.
+        """
         suffix = 'api/adv/sell'
-        while any([item['itemtype'] == 'TREASURE' for item in self.items_]):
-            item = self.items_.popleft()
-            if item['itemtype'] == 'TREASURE':
-                print(f'Selling {item["name"]}')
+        for item in [item for item in self.items_ if item['itemtype'] == 'TREASURE']:
+            self.log.info('note', text=f'Selling {item["name"]}')
+            if item['name'] not in self.prices:
                 data = {"name": item["name"]}
-                self.make_request(suffix=suffix, data=data, header=self.auth, http='post')
-                data = {"name": item["name"], "confirm": "yes"}
-                self.make_request(suffix=suffix, data=data, header=self.auth, http='post')
+                quote = self.make_request(suffix=suffix, data=data, header=self.auth, http='post')
+                self.record_price(item, quote)
+            data = {"name": item["name"], "confirm": "yes"}
+            response = self.make_request(suffix=suffix, data=data, header=self.auth, http='post')
+            if response.get('errors'):
+                # We still carry it. Quote it again next time in case the price book is wrong.
+                self.prices.pop(item['name'], None)
             else:
-                self.items_.append(item)
+                self.record_price(item, response)
+                self.items_.remove(item)
         self.status()
 
+    def record_price(self,
+                     item: dict,
+                     response: dict) -> None:
+        """Save the gold offered for <item> in a sell <response> to the price book."""
+        price = re.search(r'(\d+) gold', ' '.join(response.get('messages', [])))
+        if price:
+            self.prices[item['name']] = {'itemtype': item['itemtype'],
+                                         'weight': item['weight'],
+                                         'price': int(price.group(1))}
+
+    def item_value(self, item: dict) -> float:
+        """Gold we expect for <item>: its price if known, else its weight at the average known gold per weight.
+
+        Return None if we haven't sold any treasure yet.
+        """
+        if item['name'] in self.prices:
+            return self.prices[item['name']]['price']
+        known = [entry for entry in self.prices.values() if entry['itemtype'] == item['itemtype']]
+        weight = sum(entry['weight'] for entry in known)
+        if not weight:
+            return None
+        return item['weight'] * sum(entry['price'] for entry in known) / weight
+
     def status(self) -> dict:
         """Get the player's current status, set instance variables."""
         suffix = 'api/adv/status/'
@@ -563,10 +989,13 @@ class GamePlayer:
         response = self.make_request(suffix=suffix, data=data, header=self.auth, http='post')
         return response
 
-    def dash(self, path: list) -> None:
+    def dash(self,
+             path: list,
+             look: bool = True) -> None:
         """Use the 'dash' ability to travel straight sections in one move.
 
-        Make lists of rooms until direction changes, submit dash request, repeat.
+        Make lists of rooms until direction changes, submit dash request, repeat. Pick up items and get our status
+        at the end, if <look>ing.
         """
         if not path:
             return
@@ -584,22 +1013,38 @@ class GamePlayer:
                 rooms.append(new_room)
             # Otherwise, create dash request.
             else:
-                self.smart_dash(rooms, start_direction)
+                self.dash_run(rooms, start_direction, look)
                 # Reset variables for new direction.
                 start_direction = new_direction
                 rooms = [new_room]
         # Handle remaining room(s).
-        room, dashed = self.smart_dash(rooms, start_direction)
+        room, dashed = self.dash_run(rooms, start_direction, look)
         self.current_room = room['room_id']
         if dashed:
             self.print_status_info(room)
-        self.find_items(room)
-        self.status()
+        if look:
+            self.find_items(room)
+            self.status()
+
+    def dash_run(self,
+                 rooms: list,
+                 direction: str,
+                 look: bool = True) -> tuple:
+        """Travel a run of <rooms> in one <direction>. Warps are taken one by one."""
+        if direction == 'warp':
+            for _ in rooms:
+                room = self.warp()
+            return room, False
+        return self.smart_dash(rooms, direction, look)
 
     def smart_dash(self,
                    rooms: list,
-                   start_direction: str) -> dict:
-        """Dash isn't very fast for short runs. Fly for runs under 3 rooms."""
+                   start_direction: str,
+                   look: bool = True) -> dict:
+        """Dash isn't very fast for short runs. Fly for runs under 3 rooms.
+
+        Rooms flown through are checked for items if <look>ing, unless they're in the alternate dimension.
+        """
         suffix = 'api/adv/dash/'
         dashed = False
         if len(rooms) > 2:
@@ -610,40 +1055,78 @@ class GamePlayer:
             new_room = self.make_request(suffix=suffix, data=data, header=self.auth, http='post')
         else:
             for room in rooms:
-                new_room = self.move(start_direction, room, fly=True)
+                new_room = self.move(start_direction, room, fly=True, look=look and not self.warped)
+                self.current_room = int(new_room['room_id'])
         return new_room, dashed
 
     def wish(self) -> None:
-        """Wish at a well to get a clue. Save clue to disc."""
+        """Wish at a well to get a clue and decode it in memory. The clue is saved to disc in the background."""
         response = self.examine('WELL')
-        code = response['description'].split('\n')
-        # Save code to disc.
-        with open('clue.ls8', 'w') as f:
-            for line in code[2:]:
-                f.write(line)
-                f.write('\n')
-        self.decode_clue()
-
-    def decode_clue(self) -> None:
-        """Load clue from disc to CPU for decoding."""
-        cpu = CPU()
-        cpu.load()
-        cpu.run()
-        next_string = cpu.next_room  # CPU modified to output strings to next_room attribute.
+        text = '\n'.join(response['description'].split('\n')[2:])
+        self.queue_clue(text, self.current_room)
+        self.decode_clue(parse_text(text))
+
+    @classmethod
+    def queue_clue(cls,
+                   text: str,
+                   room: int) -> None:
+        """Save a clue in the background. Clues are saved one at a time, in the order they were queued."""
+        with cls.clue_lock:
+            if cls.clue_writer is None:
+                cls.clue_writer = threading.Thread(target=cls.save_clues, daemon=True)
+                cls.clue_writer.start()
+                atexit.register(cls.clues.join)
+        cls.clues.put((text, room))
+
+    @classmethod
+    def save_clues(cls) -> None:
+        """Save queued clues forever. A clue that can't be saved is skipped."""
+        while True:
+            text, room = cls.clues.get()
+            try:
+                cls.save_clue(text, room)
+            except (OSError, ValueError):
+                pass
+            finally:
+                cls.clues.task_done()
+
+    @staticmethod
+    def save_clue(text: str, room: int) -> None:
+        """Save a clue's program <text> to clue.ls8, with a readable listing in clues.lst for analysis."""
+        # Write then rename, so clue.ls8 is never read half written.
+        with open('clue.ls8.tmp', 'w') as f:
+            f.write(text + '\n')
+        os.replace('clue.ls8.tmp', 'clue.ls8')
+        with open('clues.lst', 'a') as f:
+            f.write(f'# {datetime.now().isoformat()} room {room}\n')
+            f.write(disassemble(parse_text(text)) + '\n\n')
+
+    @timed('clue', 'decode_clue')
+    def decode_clue(self, program: bytes = None) -> None:
+        """Decode the clue <program> on a pooled CPU, or the one saved in clue.ls8."""
+        if program is None:
+            # Let any clue still being saved land first.
+            self.clues.join()
+            program = read_program('clue.ls8')
+        with self.cpus.borrow(program) as cpu:
+            cpu.run()
+            next_string = cpu.next_room  # CPU modified to output strings to next_room attribute.
         self.room_from_clue(next_string)
 
     def room_from_clue(self, string: str) -> None:
-        """Extract digits from <string>. Set mine room_id."""
+        """Extract digits from <string>. Set mine room_id, or the snitch's in the alternate dimension."""
         room = re.search(r'\d+', string)
         next_room = int(room.group(0))
         # Update room id.
-        self.places['mine']['room_id'] = next_room
+        self.places['snitch' if self.warped else 'mine']['room_id'] = next_room
 
     def warp(self) -> dict:
         """Warp to alternate dimension."""
         suffix = 'api/adv/warp/'
         response = self.make_request(suffix=suffix, header=self.auth, http='post')
         self.warped = not self.warped
+        # The response tells us where we landed, so there's no need to re-initialize.
+        self.current_room = int(response.get('room_id', self.counterpart(self.current_room)))
         return response
 
     def transmogrify(self, item: str) -> dict:
@@ -674,14 +1157,33 @@ class GamePlayer:
                   last_proof: int,
                   difficulty: int) -> None:
         """Generate new proof to mine new block."""
+        self.log.info('note', text=f'Finding proof...\nlast_proof: {last_proof}, difficulty: {difficulty}')
+        x = self.find_proof(last_proof, difficulty)
+        self.log.info('note', text=f'Submitting proof: {x}')
+        self.mine(x)
+
+    @timed('proof', 'hashing')
+    def find_proof(self,
+                   last_proof: int,
+                   difficulty: int) -> int:
+        """Search for the first proof of <last_proof> at <difficulty>, or have the proof pool find one.
+
+        Search here if the pool can't be reached or has no proof in time.
+        """
+        if self.proof_pool:
+            from proof_pool import solve_proof
+            try:
+                proof = solve_proof(self.proof_pool, last_proof, difficulty)
+            except OSError:
+                proof = None
+            if proof is not None:
+                return proof
+            self.log.warning('note', text='No proof from the proof pool. Searching here.')
         x = 0
-        print(f'Finding proof...\nlast_proof: {last_proof}, difficulty: {difficulty}')
         while True:
             string = (str(last_proof) + str(x)).encode()
             if self.is_proof(string, difficulty):
-                print(f'Submitting proof: {x}')
-                self.mine(x)
-                break
+                return x
             x += 1
 
     def mine(self, new_proof: int) -> dict:
@@ -702,5 +1204,102 @@ class GamePlayer:
         self.balance_ = int(balance.group(0))
 
 
+def command_play(args) -> None:
+    game = GamePlayer(url=args.url, record=args.record, replay=args.replay, seed=args.seed,
+                      session=None if args.fresh else args.session, proof_pool=args.proof_pool,
+                      shared_map=args.shared_map, metrics=args.metrics)
+    game.auto_play()
+
+
+def command_decode(args) -> None:
+    """Run a clue program and print what it prints."""
+    from cpu import CPU
+    cpu = CPU(clock=VirtualClock())
+    cpu.reset(read_program(args.file))
+    cpu.run()
+    print()
+
+
+def command_mine(args) -> None:
+    """Print a proof for the given last proof, or the server's. Submit it with --submit."""
+    game = GamePlayer(url=args.url, session=None, proof_pool=args.proof_pool)
+    last_proof, difficulty = args.last_proof, args.difficulty
+    if last_proof is None or difficulty is None:
+        response = game.make_request(suffix='api/bc/last_proof/', header=game.auth, http='get')
+        last_proof, difficulty = response['proof'], response['difficulty']
+    proof = game.find_proof(last_proof, difficulty)
+    print(f'last_proof: {last_proof}, difficulty: {difficulty}, proof: {proof}')
+    if args.submit:
+        game.mine(proof)
+
+
+def command_route(args) -> None:
+    """Print the path between two rooms."""
+    from events import WARNING
+    game = GamePlayer(session=None)
+    game.log.level = WARNING
+    game.load_map()
+    game.warp_ = not args.no_warp
+    try:
+        path = game.find_path(args.target, start=args.start)
+    except NoRoute:
+        print(f'No path from {args.start} to {args.target}.')
+        return
+    for room, direction in path:
+        print(f'{direction:<5} {room}')
+    print(f'{len(path)} steps, about {game.travel_cost(path)} cooldowns')
+
+
+def command_map_stats(args) -> None:
+    """Summarize the saved map."""
+    from collections import Counter
+    with open('world.pickle', 'rb') as f:
+        world = pickle.load(f)
+    exits = [world[room].get(f'to_{exit_}') for room in world for exit_ in world[room]['meta']['exits']]
+    terrain = Counter(room['meta'].get('terrain') for room in world.values())
+    print(f'Rooms: {len(world)} ({sum(room < DIMENSION for room in world)} in the first dimension, '
+          f'{sum(room >= DIMENSION for room in world)} in the alternate)')
+    print(f'Exits: {len(exits)}, unexplored: {exits.count(None)}')
+    print(f'Dead ends: {sum(len(room["meta"]["exits"]) == 1 for room in world.values())}')
+    print(f'Terrain: {", ".join(f"{name} {count}" for name, count in terrain.most_common())}')
+
+
+def main(argv: list = None) -> None:
+    """Command line entry point. Modules only some commands need are imported by those commands."""
+    import argparse
+    parser = argparse.ArgumentParser(prog='play_it.py', description='Play the Lambda Treasure Hunt.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    play = commands.add_parser('play', help='play forever')
+    play.add_argument('--url', default=URL)
+    play.add_argument('--seed', type=int)
+    play.add_argument('--record', help='log every request and response to this file')
+    play.add_argument('--replay', help='play back a recorded session offline')
+    play.add_argument('--session', default=SESSION, help='where to save player state between runs')
+    play.add_argument('--fresh', action='store_true', help='ignore and never save a session')
+    play.add_argument('--proof-pool', help='address of a proof_pool coordinator')
+    play.add_argument('--shared-map', help='read and write the map in this shared_map file')
+    play.add_argument('--metrics', help='write timing histograms to this file, as Prometheus text if it ends in .prom')
+    play.set_defaults(function=command_play)
+    decode = commands.add_parser('decode', help='run a clue program')
+    decode.add_argument('file')
+    decode.set_defaults(function=command_decode)
+    mine = commands.add_parser('mine', help='find a proof of work')
+    mine.add_argument('last_proof', type=int, nargs='?')
+    mine.add_argument('difficulty', type=int, nargs='?')
+    mine.add_argument('--url', default=URL)
+    mine.add_argument('--proof-pool', help='address of a proof_pool coordinator')
+    mine.add_argument('--submit', action='store_true', help='mine a coin with the proof')
+    mine.set_defaults(function=command_mine)
+    route = commands.add_parser('route', help='find the path between two rooms')
+    route.add_argument('start', type=int)
+    route.add_argument('target', type=int)
+    route.add_argument('--no-warp', action='store_true', help="route as if we can't warp")
+    route.set_defaults(function=command_route)
+    map_stats = commands.add_parser('map-stats', help='summarize the saved map')
+    map_stats.set_defaults(function=command_map_stats)
+    args = parser.parse_args(argv)
+    args.function(args)
+
+
 if __name__ == '__main__':
-    pass
+    main()
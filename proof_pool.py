@@ -0,0 +1,310 @@
+"""Share proof of work searches between processes and machines.
+
+A coordinator splits each (last_proof, difficulty) job into disjoint nonce ranges and hands them to any number of
+workers. It keeps the first valid proof and tells every worker to drop the job. Players ask the coordinator to
+solve a job, and players asking for the same job share one search.
+
+    $ python proof_pool.py serve localhost:8765     # Or a Unix socket path, like /tmp/proofs.sock.
+    $ python proof_pool.py work localhost:8765 4    # 4 worker processes. Run on as many hosts as you like.
+    >>> game = GamePlayer(proof_pool='localhost:8765')
+
+Messages are JSON lines:
+
+    worker -> {"op": "work"}           <- {"job": [last_proof, difficulty], "start": a, "end": b}
+                                          or {"job": null} when there's nothing to do.
+    worker -> {"op": "found", "job": [last_proof, difficulty], "proof": x}
+    player -> {"op": "solve", "job": [last_proof, difficulty], "timeout": t}   <- {"job": [...], "proof": x}
+                                          or {"job": [...], "proof": null} if no worker found one in t seconds.
+    coordinator -> every worker {"cancel": [last_proof, difficulty]} once a job is solved, or nobody waits for it.
+"""
+
+import json
+import os
+import select
+import socket
+import socketserver
+import sys
+import threading
+import time
+from hashlib import sha256
+from multiprocessing import Process
+
+# Nonces per range. Small enough that a slow or lost worker holds up little of a job.
+CHUNK = 50000
+# Seconds an idle worker waits before asking for work again.
+IDLE = .1
+# Solved jobs remembered for late askers.
+SOLVED = 1000
+# Seconds a player waits for the pool before searching by itself.
+TIMEOUT = 10
+
+
+def search(last_proof: int,
+           difficulty: int,
+           start: int,
+           end: int,
+           cancelled=None,
+           check_every: int = 4096) -> int:
+    """Return the first proof of <last_proof> at <difficulty> in [<start>, <end>), or None.
+
+    Give up early when <cancelled>() is true, checked every <check_every> nonces.
+    """
+    prefix = sha256(str(last_proof).encode())
+    target = '0' * difficulty
+    for x in range(start, end):
+        hash_ = prefix.copy()
+        hash_.update(str(x).encode())
+        if hash_.hexdigest().startswith(target):
+            return x
+        if cancelled and x % check_every == 0 and cancelled():
+            return None
+    return None
+
+
+def is_proof(last_proof: int,
+             proof: int,
+             difficulty: int) -> bool:
+    return sha256(f'{last_proof}{proof}'.encode()).hexdigest()[:difficulty] == '0' * difficulty
+
+
+def connect(address: str) -> socket.socket:
+    """Connect to 'host:port' over TCP, or to a Unix socket at any other <address>."""
+    host, _, port = address.rpartition(':')
+    if port.isdigit():
+        return socket.create_connection((host or 'localhost', int(port)))
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(address)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+class Connection:
+    """JSON lines over a socket. Sends are locked so broadcasts and replies don't interleave."""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.buffer = b''
+        self.lock = threading.Lock()
+
+    def send(self, message: dict) -> None:
+        with self.lock:
+            self.sock.sendall(json.dumps(message).encode() + b'\n')
+
+    def receive(self) -> dict:
+        while b'\n' not in self.buffer:
+            data = self.sock.recv(4096)
+            if not data:
+                raise ConnectionError('Connection closed')
+            self.buffer += data
+        line, self.buffer = self.buffer.split(b'\n', 1)
+        return json.loads(line)
+
+    def pending(self) -> bool:
+        """Whether a message can be received without blocking."""
+        return b'\n' in self.buffer or bool(select.select([self.sock], [], [], 0)[0])
+
+    def close(self) -> None:
+        self.sock.close()
+
+
+class Coordinator:
+    """Hand out nonce ranges for unsolved jobs, oldest job first, and collect proofs."""
+
+    def __init__(self, chunk: int = CHUNK):
+        self.chunk = chunk
+        self.condition = threading.Condition()
+        # {(last_proof, difficulty): next nonce to hand out} for unsolved jobs.
+        self.jobs = {}
+        # {(last_proof, difficulty): players waiting for it}. A job nobody waits for any more is dropped.
+        self.waiting = {}
+        # {(last_proof, difficulty): proof}
+        self.solved = {}
+        self.workers = set()
+        self.ranges = 0
+
+    def next_range(self) -> dict:
+        with self.condition:
+            for job, start in self.jobs.items():
+                self.jobs[job] = start + self.chunk
+                self.ranges += 1
+                return {'job': list(job), 'start': start, 'end': start + self.chunk}
+        return {'job': None}
+
+    def found(self,
+              job: tuple,
+              proof: int) -> None:
+        """Keep the first valid <proof> of <job> and cancel it on every worker."""
+        if not is_proof(job[0], proof, job[1]):
+            return
+        with self.condition:
+            if job not in self.jobs:
+                return
+            del self.jobs[job]
+            self.solved[job] = proof
+            while len(self.solved) > SOLVED:
+                del self.solved[next(iter(self.solved))]
+            self.condition.notify_all()
+        self.cancel(job)
+
+    def cancel(self, job: tuple) -> None:
+        """Tell every worker to stop searching <job>."""
+        with self.condition:
+            workers = list(self.workers)
+        for worker in workers:
+            try:
+                worker.send({'cancel': list(job)})
+            except OSError:
+                pass
+
+    def solve(self,
+              job: tuple,
+              timeout: float = None) -> int:
+        """Wait up to <timeout> seconds for a proof of <job>, starting a search for it unless one is running or done.
+
+        Return None if there's no proof by then, or right away if no workers are connected to search. A job that
+        times out for every player waiting on it is dropped, so workers move on to newer jobs.
+        """
+        with self.condition:
+            if job not in self.solved:
+                if not self.workers:
+                    return None
+                self.jobs.setdefault(job, 0)
+            self.waiting[job] = self.waiting.get(job, 0) + 1
+            try:
+                self.condition.wait_for(lambda: job in self.solved, timeout)
+            finally:
+                self.waiting[job] -= 1
+                if not self.waiting[job]:
+                    del self.waiting[job]
+                abandoned = job not in self.waiting and self.jobs.pop(job, None) is not None
+            proof = self.solved.get(job)
+        if abandoned:
+            self.cancel(job)
+        return proof
+
+    def handle(self, connection: Connection) -> None:
+        """Serve one worker or player until it disconnects."""
+        try:
+            while True:
+                message = connection.receive()
+                op = message.get('op')
+                if op == 'work':
+                    with self.condition:
+                        self.workers.add(connection)
+                    connection.send(self.next_range())
+                elif op == 'found':
+                    self.found(tuple(message['job']), int(message['proof']))
+                elif op == 'solve':
+                    job = tuple(message['job'])
+                    connection.send({'job': list(job), 'proof': self.solve(job, message.get('timeout'))})
+        except (ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            with self.condition:
+                self.workers.discard(connection)
+            connection.close()
+
+
+class CoordinatorHandler(socketserver.BaseRequestHandler):
+
+    def handle(self) -> None:
+        self.server.coordinator.handle(Connection(self.request))
+
+
+class TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def serve(address: str,
+          chunk: int = CHUNK) -> socketserver.BaseServer:
+    """Start a coordinator at <address> in a background thread. Its Coordinator is server.coordinator."""
+    host, _, port = address.rpartition(':')
+    if port.isdigit():
+        server = TCPServer((host or 'localhost', int(port)), CoordinatorHandler)
+    else:
+        if os.path.exists(address):
+            os.remove(address)
+        server = UnixServer(address, CoordinatorHandler)
+    server.coordinator = Coordinator(chunk)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def work(address: str) -> None:
+    """Search ranges handed out by the coordinator at <address> until it goes away."""
+    connection = Connection(connect(address))
+
+    def cancelled() -> bool:
+        # The only messages sent unasked are cancels.
+        return connection.pending() and connection.receive().get('cancel') == reply['job']
+
+    try:
+        while True:
+            connection.send({'op': 'work'})
+            reply = connection.receive()
+            # Skip cancels of jobs this worker had already finished with.
+            while 'cancel' in reply:
+                reply = connection.receive()
+            if reply['job'] is None:
+                time.sleep(IDLE)
+                continue
+            last_proof, difficulty = reply['job']
+            proof = search(last_proof, difficulty, reply['start'], reply['end'], cancelled)
+            if proof is not None:
+                connection.send({'op': 'found', 'job': reply['job'], 'proof': proof})
+    except (ConnectionError, OSError):
+        pass
+    finally:
+        connection.close()
+
+
+def start_workers(address: str, processes: int = None) -> list:
+    """Start <processes> worker processes, one per CPU by default."""
+    workers = [Process(target=work, args=(address,), daemon=True) for _ in range(processes or os.cpu_count())]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+def solve_proof(address: str,
+                last_proof: int,
+                difficulty: int,
+                timeout: float = TIMEOUT) -> int:
+    """Ask the coordinator at <address> for a proof of <last_proof> at <difficulty>.
+
+    Return None if the pool has no proof within <timeout> seconds. Raise OSError if the coordinator can't be reached.
+    """
+    connection = Connection(connect(address))
+    # Leave the coordinator time to answer that it ran out of time.
+    connection.sock.settimeout(timeout + 5)
+    try:
+        connection.send({'op': 'solve', 'job': [last_proof, difficulty], 'timeout': timeout})
+        return connection.receive()['proof']
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    command, address, *rest = sys.argv[1:]
+    if command == 'serve':
+        server = serve(address)
+        print(f'Coordinating proofs at {address}')
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            server.shutdown()
+    elif command == 'work':
+        for worker in start_workers(address, int(rest[0]) if rest else None):
+            worker.join()
+    else:
+        print(__doc__)
@@ -0,0 +1,99 @@
+"""Record and replay GamePlayer sessions.
+
+A recording is an append-only JSON lines log with one request and its response per line:
+
+    {"t": 1571500000.123, "http": "post", "suffix": "api/adv/move/", "data": {...},
+     "latency": 0.21, "cooldown": 7.5, "response": {...}}
+
+Record a real session once:
+    >>> game = GamePlayer(record='session.jsonl', seed=1)
+
+Replay it offline, with no network and no cooldown waits. Use the same seed so random rooms match:
+    >>> game = GamePlayer(replay='session.jsonl', seed=1)
+    >>> game.auto_play()  # Stops with ReplayExhausted at the end of the recording.
+"""
+
+import json
+import time
+
+
+class ReplayExhausted(EOFError):
+    """Every recorded response has been served."""
+
+
+class ReplayMismatch(ValueError):
+    """The player made a different request than the recording at the same point."""
+
+
+class Recorder:
+    """Append every request and response to the log at <path>."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, 'a')
+
+    def write(self,
+              http: str,
+              suffix: str,
+              data: dict,
+              response: dict,
+              sent: float,
+              latency: float) -> None:
+        entry = {'t': round(sent, 3),
+                 'http': http,
+                 'suffix': suffix,
+                 'data': data,
+                 'latency': round(latency, 4),
+                 'cooldown': response.get('cooldown'),
+                 'response': response}
+        self.file.write(json.dumps(entry, separators=(',', ':')) + '\n')
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class Replayer:
+    """Serve the responses logged at <path> back in order.
+
+    Each request is checked against the recorded one. In strict mode a mismatch raises ReplayMismatch,
+    otherwise it's noted in divergences and the recorded response is served anyway.
+    """
+
+    def __init__(self, path: str, strict: bool = True):
+        with open(path) as f:
+            self.entries = [json.loads(line) for line in f if line.strip()]
+        self.strict = strict
+        self.index = 0
+        self.divergences = []
+        # Cooldown the recorded session would have waited out by this point.
+        self.cooldown = 0.0
+        self.started = time.perf_counter()
+
+    def next(self,
+             http: str,
+             suffix: str,
+             data: dict) -> dict:
+        """Return the recorded response for the next request."""
+        if self.index >= len(self.entries):
+            raise ReplayExhausted(f'Replayed all {len(self.entries)} requests.')
+        entry = self.entries[self.index]
+        expected = (entry['http'], entry['suffix'], entry['data'])
+        # Round trip through JSON so tuples and ints compare as recorded.
+        actual = (http, suffix, json.loads(json.dumps(data)))
+        if expected != actual:
+            divergence = {'index': self.index, 'expected': expected, 'actual': actual}
+            if self.strict:
+                raise ReplayMismatch(divergence)
+            self.divergences.append(divergence)
+        self.index += 1
+        self.cooldown += float(entry['cooldown'] or 0)
+        return entry['response']
+
+    def report(self) -> dict:
+        """Summarize how far the replay got and how it differed from the recording."""
+        return {'requests': self.index,
+                'recorded': len(self.entries),
+                'divergences': len(self.divergences),
+                'recorded_cooldown': self.cooldown,
+                'replay_seconds': time.perf_counter() - self.started}
@@ -0,0 +1,226 @@
+"""Shortest paths that stay correct while the map changes.
+
+RouteIndex keeps a shortest path tree toward each target it has been asked about: every room's distance to the
+target and its next hop. Following next hops answers a route in O(1) per hop. When an edge is added or removed,
+only the rooms whose distance it changes are repaired, not the whole tree:
+
+- An added edge u -> v that makes u closer spreads the improvement back from u.
+- A removed edge that u's route used invalidates u and every room routed through u. Those rooms get their best
+  distance through rooms that weren't routed through u, and that improvement spreads among them.
+
+    >>> routes = RouteIndex(game.edges)
+    >>> routes.sync(game.world)     # Apply whatever changed since the last sync.
+    >>> routes.path(0, 555)         # [(room, direction), ...]
+
+In validation mode, every <validate>th route is checked against a fresh search of the current map.
+"""
+
+import heapq
+from collections import OrderedDict
+
+INFINITY = float('inf')
+
+
+class RouteMismatch(AssertionError):
+    """The index's route differs from a fresh search of the map."""
+
+
+class NoRoute(LookupError):
+    """No known path leads to the target."""
+
+
+class RouteIndex:
+    """Incrementally maintained shortest path trees over the edges <edges>(room) yields as (room, direction, cost).
+
+    Keeps trees for the <max_targets> most recently routed to targets, once they've been routed to twice. Places
+    like the shop and shrines are routed to over and over, while a random room is usually routed to once, and its
+    tree would only push a useful one out.
+    """
+
+    def __init__(self,
+                 edges,
+                 max_targets: int = 8,
+                 validate: int = 0,
+                 strict: bool = True):
+        self.edges = edges
+        self.max_targets = max_targets
+        self.validate = validate
+        self.strict = strict
+        # {room: {direction: (next room, cost)}} as of the last sync, and the reverse,
+        # {room: {(from room, direction): cost}}.
+        self.out = {}
+        self.into = {}
+        # {target: (distances, next hops)} with distances {room: cost} and next hops {room: (next room, direction)}.
+        self.trees = OrderedDict()
+        # Targets routed to recently, as an ordered set.
+        self.seen = OrderedDict()
+        self.queries = 0
+        self.mismatches = []
+
+    def sync(self, rooms) -> int:
+        """Compare the edges out of <rooms> with the index and apply the differences. Return how many there were."""
+        changes = 0
+        for room in list(rooms):
+            new = {direction: (next_room, cost) for next_room, direction, cost in self.current_edges(room)}
+            old = self.out.get(room, {})
+            for direction, edge in list(old.items()):
+                if new.get(direction) != edge:
+                    self.delete_edge(room, direction)
+                    changes += 1
+            for direction, (next_room, cost) in new.items():
+                if old.get(direction) != (next_room, cost):
+                    self.insert_edge(room, direction, next_room, cost)
+                    changes += 1
+        return changes
+
+    def current_edges(self, room: int):
+        """The edges out of <room> in the map, skipping unexplored exits."""
+        try:
+            for next_room, direction, cost in self.edges(room):
+                if next_room is not None and next_room is not False:
+                    yield next_room, direction, cost
+        except KeyError:
+            # The room is gone from the map.
+            return
+
+    def insert_edge(self,
+                    room: int,
+                    direction: str,
+                    next_room: int,
+                    cost: float) -> None:
+        """Add the edge <room> -> <next_room> and spread any shortcut it makes through every tree."""
+        if direction in self.out.get(room, {}):
+            self.delete_edge(room, direction)
+        self.out.setdefault(room, {})[direction] = (next_room, cost)
+        self.into.setdefault(next_room, {})[room, direction] = cost
+        for distances, next_hops in self.trees.values():
+            distance = distances.get(next_room, INFINITY) + cost
+            if distance < distances.get(room, INFINITY):
+                distances[room] = distance
+                next_hops[room] = (next_room, direction)
+                self.relax(distances, next_hops, [(distance, room)])
+
+    def delete_edge(self,
+                    room: int,
+                    direction: str) -> None:
+        """Remove the edge out of <room> in <direction> and repair the trees that used it."""
+        next_room, _ = self.out[room].pop(direction)
+        del self.into[next_room][room, direction]
+        for distances, next_hops in self.trees.values():
+            if next_hops.get(room) == (next_room, direction):
+                self.repair(room, distances, next_hops)
+
+    def repair(self,
+               room: int,
+               distances: dict,
+               next_hops: dict) -> None:
+        """Recompute the distances of <room> and every room routed through it."""
+        # Find the rooms routed through <room>.
+        affected, stack = {room}, [room]
+        while stack:
+            current = stack.pop()
+            for previous, _ in self.into.get(current, ()):
+                if previous not in affected and next_hops.get(previous, (None,))[0] == current:
+                    affected.add(previous)
+                    stack.append(previous)
+        for current in affected:
+            del distances[current]
+            del next_hops[current]
+        # Give each its best distance through rooms that weren't affected, then let them improve each other.
+        queue = []
+        for current in affected:
+            for direction, (next_room, cost) in self.out.get(current, {}).items():
+                distance = distances.get(next_room, INFINITY) + cost
+                if distance < distances.get(current, INFINITY):
+                    distances[current] = distance
+                    next_hops[current] = (next_room, direction)
+            if current in distances:
+                queue.append((distances[current], current))
+        heapq.heapify(queue)
+        self.relax(distances, next_hops, queue)
+
+    def relax(self,
+              distances: dict,
+              next_hops: dict,
+              queue: list) -> None:
+        """Spread the shorter distances in <queue> back along incoming edges, Dijkstra style."""
+        into, heappop, heappush = self.into, heapq.heappop, heapq.heappush
+        while queue:
+            distance, room = heappop(queue)
+            if distance > distances.get(room, INFINITY):
+                continue
+            for (previous, direction), cost in into.get(room, {}).items():
+                new_distance = distance + cost
+                if new_distance < distances.get(previous, INFINITY):
+                    distances[previous] = new_distance
+                    next_hops[previous] = (room, direction)
+                    heappush(queue, (new_distance, previous))
+
+    def tree(self, target: int) -> tuple:
+        """The shortest path tree toward <target>. Kept from the second time it's needed."""
+        if target in self.trees:
+            self.trees.move_to_end(target)
+            return self.trees[target]
+        distances, next_hops = {target: 0}, {}
+        self.relax(distances, next_hops, [(0, target)])
+        if target in self.seen:
+            self.trees[target] = distances, next_hops
+            if len(self.trees) > self.max_targets:
+                self.trees.popitem(last=False)
+        else:
+            self.seen[target] = None
+            if len(self.seen) > 4 * self.max_targets:
+                self.seen.popitem(last=False)
+        return distances, next_hops
+
+    def distance(self,
+                 start: int,
+                 target: int) -> float:
+        return self.tree(target)[0].get(start, INFINITY)
+
+    def path(self,
+             start: int,
+             target: int) -> list:
+        """The cheapest path from <start> to <target> as [(room, direction), ...], or None if there is none."""
+        distances, next_hops = self.tree(target)
+        path, cost = None, distances.get(start, INFINITY)
+        if start in distances:
+            path, room = [], start
+            while room != target:
+                room, direction = next_hops[room]
+                path.append((room, direction))
+        self.queries += 1
+        if self.validate and self.queries % self.validate == 0:
+            self.check(start, target, cost)
+        return path
+
+    def search(self,
+               start: int,
+               target: int) -> float:
+        """Cost of the cheapest path from <start> to <target> by a fresh Dijkstra over the current map."""
+        distances, queue = {start: 0}, [(0, start)]
+        while queue:
+            distance, room = heapq.heappop(queue)
+            if room == target:
+                return distance
+            if distance > distances[room]:
+                continue
+            for next_room, _, cost in self.current_edges(room):
+                if distance + cost < distances.get(next_room, INFINITY):
+                    distances[next_room] = distance + cost
+                    heapq.heappush(queue, (distance + cost, next_room))
+        return INFINITY
+
+    def check(self,
+              start: int,
+              target: int,
+              cost: float) -> None:
+        """Compare the <cost> of a route with a fresh search. On a mismatch raise RouteMismatch when strict, else
+        note it and rebuild the tree."""
+        expected = self.search(start, target)
+        if cost != expected:
+            mismatch = {'start': start, 'target': target, 'expected': expected, 'actual': cost}
+            if self.strict:
+                raise RouteMismatch(mismatch)
+            self.mismatches.append(mismatch)
+            self.trees.pop(target, None)
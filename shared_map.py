@@ -0,0 +1,228 @@
+"""The world map in a memory-mapped file, shared by every player process on a host.
+
+One writer owns the file. Any number of readers map it and index it in place, so a fleet of players holds one
+copy of the map between them, and every player routes on the rooms the writer has found so far. The first player
+to open the map claims the writer role, and when the writer exits the next player to write takes it over.
+
+    $ python shared_map.py publish world.pickle world.map
+    >>> game = GamePlayer(shared_map='world.map')
+
+The file is a header followed by one array per field, each with a slot per room id:
+
+    header      magic b'LTHW', capacity (uint32), version (uint64)
+    links       to_n, to_s, to_e, to_w per room (int16). UNEXPLORED for None, NO_EXIT for False.
+    exits       bit per exit of the room's meta['exits'], plus PRESENT once the room is known (uint8)
+    terrain     index into TERRAINS (uint8)
+    elevation   (uint8)
+
+The writer bumps version after every change, so readers can tell when anything they worked out from the map has
+gone stale. Arrays are in native byte order, as the file never leaves the host.
+"""
+
+import fcntl
+import mmap
+import os
+import pickle
+import sys
+
+MAGIC = b'LTHW'
+HEADER = 16
+DIRECTIONS = ('n', 's', 'e', 'w')
+LINKS = {f'to_{direction}': i for i, direction in enumerate(DIRECTIONS)}
+UNEXPLORED, NO_EXIT = -1, -2
+PRESENT = 1 << len(DIRECTIONS)
+TERRAINS = ('NORMAL', 'MOUNTAIN', 'CAVE', 'TRAP')
+# The exits list of every exits byte.
+EXITS = [tuple(direction for i, direction in enumerate(DIRECTIONS) if bits & (1 << i)) for bits in range(PRESENT)]
+
+
+class RoomView:
+    """One room of a SharedWorld, read in place. Looks like a room of the pickled map."""
+
+    __slots__ = ('world', 'room')
+
+    def __init__(self, world, room: int):
+        self.world = world
+        self.room = room
+
+    def __getitem__(self, key: str):
+        if key == 'meta':
+            return self.world.meta(self.room)
+        link = self.world.links[self.room * 4 + LINKS[key]]
+        if link == UNEXPLORED:
+            return None
+        if link == NO_EXIT:
+            return False
+        return link
+
+    def __setitem__(self,
+                    key: str,
+                    link) -> None:
+        """Link the room to another, as exploring does, if the map is writable."""
+        self.world.link(self.room, key, link)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+class SharedWorld:
+    """The map file at <path>, read only unless <writable>. Only one process at a time may write."""
+
+    def __init__(self,
+                 path: str,
+                 writable: bool = False):
+        self.path = path
+        self.writable = False
+        self.file = open(path, 'rb')
+        self.open_map()
+        if writable and not self.claim():
+            self.close()
+            raise PermissionError(f'Another process is writing {path}')
+
+    def claim(self) -> bool:
+        """Become the map's writer unless another process is. Return whether this process writes the map."""
+        if self.writable:
+            return True
+        file = open(self.path, 'r+b')
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            file.close()
+            return False
+        # Map the file again, writable. The lock lives as long as the file stays open.
+        self.close()
+        self.file, self.writable = file, True
+        self.open_map()
+        return True
+
+    def open_map(self) -> None:
+        """Map the file and index its arrays in place."""
+        self.map = mmap.mmap(self.file.fileno(), 0,
+                             access=mmap.ACCESS_WRITE if self.writable else mmap.ACCESS_READ)
+        if self.map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{self.path} is not a shared map')
+        # Views index the mapped file in place. Nothing is copied.
+        self.view = memoryview(self.map)
+        self.capacity = int.from_bytes(self.view[4:8], sys.byteorder)
+        self.header = self.view[8:HEADER].cast('Q')
+        offset = HEADER
+        self.links = self.view[offset:offset + 8 * self.capacity].cast('h')
+        offset += 8 * self.capacity
+        self.exits, self.terrain, self.elevation = (self.view[offset + i * self.capacity:
+                                                              offset + (i + 1) * self.capacity]
+                                                    for i in range(3))
+
+    @classmethod
+    def create(cls,
+               path: str,
+               world: dict,
+               capacity: int = 1000) -> 'SharedWorld':
+        """Write <world> to a new map file at <path> with room for <capacity> room ids. Return it, writable."""
+        capacity = max(capacity, max(world, default=-1) + 1)
+        with open(path, 'wb') as f:
+            f.write(MAGIC + capacity.to_bytes(4, sys.byteorder) + bytes(HEADER - 8))
+            f.write(UNEXPLORED.to_bytes(2, sys.byteorder, signed=True) * 4 * capacity)
+            f.write(bytes(3 * capacity))
+        shared = cls(path, writable=True)
+        for room, data in world.items():
+            shared[room] = data
+        return shared
+
+    @property
+    def version(self) -> int:
+        return self.header[0]
+
+    def __contains__(self, room) -> bool:
+        try:
+            return 0 <= room < self.capacity and self.exits[room] & PRESENT != 0
+        except TypeError:
+            return False
+
+    def __getitem__(self, room: int) -> RoomView:
+        # Inlined __contains__, as routing looks up rooms constantly.
+        try:
+            if 0 <= room < self.capacity and self.exits[room] & PRESENT:
+                return RoomView(self, room)
+        except TypeError:
+            pass
+        raise KeyError(room)
+
+    def get(self, room: int, default=None):
+        return self[room] if room in self else default
+
+    def __iter__(self):
+        return (room for room in range(self.capacity) if self.exits[room] & PRESENT)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __bool__(self) -> bool:
+        return any(self.exits[room] & PRESENT for room in range(self.capacity))
+
+    def meta(self, room: int) -> dict:
+        """What the map keeps of the room's meta: its id, exits, terrain and elevation."""
+        return {'room_id': room,
+                'exits': list(EXITS[self.exits[room] & ~PRESENT]),
+                'terrain': TERRAINS[self.terrain[room]],
+                'elevation': self.elevation[room]}
+
+    def __setitem__(self,
+                    room: int,
+                    data) -> None:
+        """Write a room, as a pickled map's room dict, and bump the version. Claim the writer role if it's free."""
+        if not self.claim():
+            raise PermissionError(f'Another process is writing {self.path}')
+        if not 0 <= room < self.capacity:
+            raise IndexError(f'Room {room} is beyond the map capacity of {self.capacity}')
+        meta = data['meta']
+        for i, direction in enumerate(DIRECTIONS):
+            self.links[room * 4 + i] = self.encode(data.get(f'to_{direction}'))
+        self.terrain[room] = TERRAINS.index(meta.get('terrain', 'NORMAL'))
+        self.elevation[room] = meta.get('elevation', 0)
+        # Mark the room present last, so readers never see a known room with half its data.
+        self.exits[room] = PRESENT | sum(1 << i for i, direction in enumerate(DIRECTIONS)
+                                         if direction in meta['exits'])
+        self.header[0] += 1
+
+    def link(self,
+             room: int,
+             key: str,
+             link) -> None:
+        """Set one of <room>'s to_* <key>s to <link> and bump the version. Claim the writer role if it's free."""
+        if not self.claim():
+            raise PermissionError(f'Another process is writing {self.path}')
+        self.links[room * 4 + LINKS[key]] = self.encode(link)
+        self.header[0] += 1
+
+    @staticmethod
+    def encode(link) -> int:
+        return UNEXPLORED if link is None else NO_EXIT if link is False else link
+
+    def close(self) -> None:
+        for view in (self.links, self.exits, self.terrain, self.elevation, self.header, self.view):
+            view.release()
+        self.map.close()
+        self.file.close()
+
+
+if __name__ == '__main__':
+    command, *paths = sys.argv[1:]
+    if command == 'publish':
+        with open(paths[0], 'rb') as f:
+            world = pickle.load(f)
+        if os.path.exists(paths[1]):
+            # Update in place, so players already reading the map see the new rooms.
+            shared = SharedWorld(paths[1], writable=True)
+            for room, data in world.items():
+                shared[room] = data
+            shared.close()
+        else:
+            # Write a new file and swap it in, so readers never map a half written one.
+            SharedWorld.create(f'{paths[1]}.tmp', world).close()
+            os.replace(f'{paths[1]}.tmp', paths[1])
+        print(f'Published {len(world)} rooms to {paths[1]}')
+    else:
+        print(__doc__)
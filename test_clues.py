@@ -0,0 +1,14 @@
+from local_server import clue_program
+from play_it import GamePlayer
+
+
+def test_clues_saved_in_order(world_dir):
+    game = GamePlayer(session=None)
+    for room in range(30):
+        GamePlayer.queue_clue('\n'.join(clue_program(f'Mine your coin in room {room}')), room)
+    # Decoding the saved clue waits for the queue, so it reads the last one.
+    game.decode_clue()
+    assert game.places['mine']['room_id'] == 29
+    listing = (world_dir / 'clues.lst').read_text()
+    assert [int(line.split()[-1]) for line in listing.splitlines() if line.startswith('#')] == list(range(30))
+    assert not (world_dir / 'clue.ls8.tmp').exists()
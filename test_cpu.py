@@ -0,0 +1,131 @@
+from cpu import CPU, CPUPool, VirtualClock
+from ls8 import assemble
+
+HELLO = assemble("""
+    LDI R0, 'H'
+    PRA R0
+    LDI R0, 'i'
+    PRA R0
+    HLT
+""")
+# Counts down from 30 printing each number, so runs can be stopped and resumed part way.
+COUNTDOWN = assemble("""
+    LDI R0, 30
+    LDI R1, Loop
+    LDI R2, 0
+Loop:
+    PRN R0
+    DEC R0
+    CMP R0, R2
+    JNE R1
+    HLT
+""")
+LOOP = 9
+
+
+def test_snapshot_restore():
+    cpu = CPU(clock=VirtualClock())
+    cpu.reset(COUNTDOWN)
+    start = cpu.snapshot()
+    whole = cpu.run()
+    cpu.restore(start)
+    assert cpu.run() == whole == ''.join(str(n) for n in range(30, 0, -1))
+
+
+def test_fork_from_snapshot():
+    cpu = CPU(clock=VirtualClock())
+    cpu.reset(COUNTDOWN)
+    cpu.run(until=LOOP)
+    checkpoint = cpu.snapshot()
+    assert cpu.pc == LOOP and cpu.next_room == ''
+    forks = [CPU(clock=VirtualClock()) for _ in range(3)]
+    for fork in forks:
+        fork.restore(checkpoint)
+    assert {fork.run() for fork in forks} == {cpu.run()}
+
+
+def test_reset_matches_new_cpu():
+    cpu = CPU(clock=VirtualClock())
+    cpu.reset(COUNTDOWN)
+    cpu.run()
+    cpu.reset(HELLO)
+    fresh = CPU(clock=VirtualClock())
+    fresh.load_image(HELLO)
+    assert cpu.snapshot() == fresh.snapshot()
+    assert cpu.run() == 'Hi'
+
+
+def test_pool_reuses_cpus():
+    pool = CPUPool(clock=VirtualClock)
+    with pool.borrow(HELLO) as cpu:
+        assert cpu.run() == 'Hi'
+    with pool.borrow(COUNTDOWN) as again:
+        assert again is cpu
+        assert again.run().startswith('3029')
+
+
+def test_profiler_counts_and_detaches(capsys):
+    cpu = CPU(clock=VirtualClock())
+    cpu.reset(COUNTDOWN)
+    profiler = cpu.profile(ring_size=4)
+    assert cpu.run() == ''.join(str(n) for n in range(30, 0, -1))
+    assert profiler.counts['PRN'] == profiler.counts['JNE'] == 30
+    assert profiler.pc_counts[LOOP] == 30
+    assert [entry[1] for entry in profiler.ring] == ['DEC', 'CMP', 'JNE', 'HLT']
+    assert 'Last instructions:' in capsys.readouterr().out
+    profiler.detach()
+    assert cpu.profiler is None
+    assert cpu.op_map[0][0][0b0111].__self__ is cpu
+
+
+# Counts timer interrupts in ram[0x80] while looping, then prints the count.
+TIMER = assemble("""
+    LDI R0, Timer
+    LDI R1, 0xf8
+    ST R1, R0
+    LDI R5, 1       # Unmask the timer.
+    LDI R2, 100
+    LDI R3, Loop
+    LDI R4, 0
+Loop:
+    DEC R2
+    CMP R2, R4
+    JNE R3
+    LDI R0, 0x80
+    LD R1, R0
+    PRN R1
+    HLT
+Timer:
+    LDI R0, 0x80
+    LD R1, R0
+    INC R1
+    ST R0, R1
+    IRET
+""")
+TIMER_LOOP = 21
+
+
+def test_virtual_clock_fork_equivalence():
+    whole = CPU(clock=VirtualClock(7))
+    whole.reset(TIMER)
+    expected = whole.run()
+    assert int(expected) > 0
+
+    cpu = CPU(clock=VirtualClock(7))
+    cpu.reset(TIMER)
+    cpu.run(until=TIMER_LOOP)
+    checkpoint = cpu.snapshot()
+    assert cpu.pc == TIMER_LOOP
+    assert checkpoint.clock == cpu.clock.count > 0
+    # A fork's clock picks up where the checkpoint's left off, so the timer fires on the same cycles.
+    fork = CPU(clock=VirtualClock(7))
+    fork.restore(checkpoint)
+    assert fork.run() == cpu.run() == expected
+
+
+def test_timer_fires_while_interrupts_off_stay_pending():
+    cpu = CPU(clock=VirtualClock(2))
+    cpu.reset(assemble('NOP\nNOP\nNOP\nHLT'))
+    cpu.interrupts = False
+    cpu.run()
+    assert cpu.reg[cpu.IS] & 1
@@ -0,0 +1,48 @@
+import pytest
+
+from play_it import GamePlayer
+
+
+@pytest.fixture
+def game():
+    """A player in room 5 of a corridor of rooms 0 to 9, without warping."""
+    game = GamePlayer(session=None)
+    game.world = {room: {'meta': {'room_id': room, 'exits': [exit_ for exit_, to in (('e', room + 1), ('w', room - 1))
+                                                              if 0 <= to < 10],
+                                  'terrain': 'NORMAL'},
+                         'to_n': False, 'to_s': False,
+                         'to_e': room + 1 if room < 9 else False,
+                         'to_w': room - 1 if room > 0 else False} for room in range(10)}
+    game.current_room = 5
+    game.warp_ = game.dash_ = False
+    return game
+
+
+def stops(errands: list) -> list:
+    return [place for errand in errands for place, _ in errand]
+
+
+def test_nearest_first(game):
+    game.places['flight']['room_id'], game.places['shop']['room_id'] = 2, 9
+    errands = [[('shop', None)], [('flight', None)]]
+    # 3 moves to flight then 7 to the shop beats 4 to the shop then 7 to flight.
+    assert stops(game.schedule_errands(errands)) == ['flight', 'shop']
+
+
+def test_mine_left_out_of_the_estimate(game):
+    game.places['shop']['room_id'], game.places['well']['room_id'] = 2, 6
+    # Where the last wish put the mine. The next wish will put it somewhere else.
+    game.places['mine']['room_id'] = 9
+    errands = [[('shop', None)], [('well', None), ('mine', None)]]
+    # Counting the stale mine would put the shop first: 3 + 4 + 3 moves against 1 + 3 + 7.
+    assert stops(game.schedule_errands(errands)) == ['well', 'mine', 'shop']
+
+
+def test_travel_cost(game):
+    path = [(1, 'e'), (2, 'e'), (3, 'e'), (4, 'n'), (5, 'n'), (6, 'warp'), (7, 'e'), (8, 'e'), (9, 'e'), (10, 'e'),
+            (11, 'warp'), (12, 'warp'), (13, 'warp')]
+    assert game.travel_cost(path) == len(path)
+    game.dash_ = True
+    # Runs of 3 or more cost one dash, shorter runs and warps a cooldown each.
+    assert game.travel_cost(path) == 1 + 2 + 1 + 1 + 3
+    assert game.travel_cost([]) == 0
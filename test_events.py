@@ -0,0 +1,48 @@
+import io
+import json
+
+from events import DEBUG, INFO, WARNING, WRITER, EventLog
+
+
+def test_levels_and_sampling():
+    stream = io.StringIO()
+    log = EventLog(level=INFO, sample={'tick': 3}, stream=stream)
+    log.debug('hidden')
+    for i in range(7):
+        log.info('tick', i=i)
+    log.flush()
+    assert 'hidden' not in stream.getvalue()
+    assert [line for line in stream.getvalue().splitlines() if line] == ['tick: i=0', 'tick: i=3', 'tick: i=6']
+
+
+def test_json_lines_and_renderers():
+    stream = io.StringIO()
+    log = EventLog(level=DEBUG, stream=stream, json_lines=True)
+    log.warning('errors', errors=['Cooldown in effect'])
+    log.flush()
+    record = json.loads(stream.getvalue())
+    assert record['level'] == 'WARNING'
+    assert record['errors'] == ['Cooldown in effect']
+    text = EventLog().render((0, WARNING, 'errors', {'errors': ['Cooldown in effect']}))
+    assert text == "\nError: ['Cooldown in effect']"
+
+
+def test_logs_share_one_writer_in_order():
+    stream = io.StringIO()
+    first, second = EventLog(stream=stream), EventLog(stream=stream)
+    for i in range(100):
+        (first if i % 2 else second).info('n', i=i)
+    first.flush()
+    assert [line for line in stream.getvalue().splitlines() if line] == [f'n: i={i}' for i in range(100)]
+    assert WRITER.thread.is_alive()
+
+
+def test_closed_stream_does_not_stop_writer():
+    closed = io.StringIO()
+    closed.close()
+    EventLog(stream=closed).info('lost')
+    stream = io.StringIO()
+    log = EventLog(stream=stream)
+    log.info('kept')
+    log.flush()
+    assert 'kept' in stream.getvalue()
@@ -0,0 +1,19 @@
+from local_server import GameWorld, benchmark
+
+
+def test_benchmark_is_deterministic(world_dir):
+    runs = [benchmark(lambda game: game.auto_play(), sim_hours=.25, seed=3, compression=2000) for _ in range(2)]
+    assert runs[0]['requests'] > 0
+    assert runs[0] == runs[1]
+    assert not (world_dir / 'player.pickle').exists()
+
+
+def test_requests_refused_after_sim_limit(world_dir):
+    world = GameWorld(seed=1)
+    world.sim_limit = 30
+    status, response = world.handle('token', 'adv/init', {})
+    assert status == 200
+    world.players['token'].sim_time = 30
+    status, response = world.handle('token', 'adv/init', {})
+    assert status == 503
+    assert response['errors'] == ['Out of simulated time']
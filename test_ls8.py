@@ -0,0 +1,65 @@
+import pytest
+
+from cpu import CPU, VirtualClock
+from ls8 import assemble, disassemble, parse_text, read_image, read_program, write_image
+
+PROGRAM = """
+Start:
+    LDI R0, ','      # A comma literal isn't an operand separator.
+    PRA R0
+    LDI R1, '#'      ; Nor is a comment character.
+    PRA R1
+    LDI R2, Start
+    HLT
+    DB 1, 2, 0x03
+"""
+
+
+def run(program: bytes) -> str:
+    cpu = CPU(clock=VirtualClock())
+    cpu.reset(program)
+    return cpu.run()
+
+
+def test_assemble_literals_and_labels():
+    program = assemble(PROGRAM)
+    assert run(program) == ',#'
+    assert program[-3:] == bytes([1, 2, 3])
+    listing = disassemble(program)
+    assert "LDI R0, 44  ; ','" in listing
+    assert 'LDI R2, 0' in listing
+
+
+def test_assemble_errors():
+    with pytest.raises(ValueError):
+        assemble('FOO R0')
+    with pytest.raises(ValueError):
+        assemble('LDI R0')
+    # A DB with no operands is no bytes.
+    assert assemble('DB\nHLT') == assemble('HLT')
+
+
+def test_image_round_trip(tmp_path):
+    program = assemble(PROGRAM)
+    path = str(tmp_path / 'program.ls8b')
+    write_image(path, program)
+    assert read_program(path) == program
+    text = tmp_path / 'program.ls8'
+    text.write_text('\n'.join(f'{byte:08b}  # comment' for byte in program))
+    assert read_program(str(text)) == parse_text(text.read_text()) == program
+
+
+def test_read_image_rejects_non_images(tmp_path):
+    empty, text = tmp_path / 'empty.ls8b', tmp_path / 'text.ls8b'
+    empty.write_bytes(b'')
+    text.write_bytes(b'10000010\n')
+    for path in (empty, text):
+        with pytest.raises(ValueError):
+            read_image(str(path))
+
+
+def test_load_image_bound():
+    cpu = CPU(clock=VirtualClock())
+    cpu.load_image(bytes(256))
+    with pytest.raises(ValueError):
+        cpu.load_image(bytes(257))
@@ -0,0 +1,46 @@
+from cpu import CPU, VirtualClock
+from ls8 import assemble
+from ls8_batch import BatchCPU, run_scalar, sample_programs
+from test_cpu import TIMER
+
+
+def test_matches_cpu_on_sample_programs():
+    programs = sample_programs(50, seed=2)
+    batch = BatchCPU(programs)
+    assert batch.run() == run_scalar(programs)
+    assert batch.errors == [None] * 50
+
+
+def test_timer_interrupts_match_virtual_clock():
+    for cycles in (3, 7, 50):
+        cpu = CPU(clock=VirtualClock(cycles))
+        cpu.reset(TIMER)
+        assert BatchCPU([TIMER], timer_cycles=cycles).run() == [cpu.run()]
+
+
+def test_stack_pointer_wraps_like_cpu():
+    # Pushes past address 0 wrap around to 0xff, and pops come back.
+    program = assemble("""
+        LDI R7, 2
+        LDI R0, 'a'
+        PUSH R0
+        PUSH R0
+        PUSH R0
+        PRN R7
+        POP R1
+        POP R1
+        POP R1
+        PRN R7
+        HLT
+    """)
+    cpu = CPU(clock=VirtualClock())
+    cpu.reset(program)
+    assert BatchCPU([program]).run() == [cpu.run()] == ['2552']
+
+
+def test_division_by_zero_stops_only_that_machine():
+    good = assemble("LDI R0, 7\nLDI R1, 2\nDIV R0, R1\nPRN R0\nHLT")
+    bad = assemble("LDI R0, 7\nLDI R1, 0\nDIV R0, R1\nPRN R0\nHLT")
+    batch = BatchCPU([good, bad])
+    assert batch.run() == ['3', '']
+    assert batch.errors == [None, 'Division by zero']
@@ -0,0 +1,84 @@
+import io
+import json
+
+import pytest
+
+from events import EventLog
+from local_server import serve
+from metrics import Histogram, Metrics, timed
+from play_it import GamePlayer
+
+
+def test_histogram_buckets():
+    histogram = Histogram()
+    for seconds in (.0005, .003, .003, .2, 7):
+        histogram.observe(seconds)
+    stats = histogram.to_dict()
+    assert stats['count'] == 5
+    assert stats['max'] == 7
+    assert stats['p50'] == .005
+    # The quantile never reports more than the largest observation.
+    assert stats['p95'] == 7
+
+
+def test_timed_and_exports():
+    class Player:
+        def __init__(self):
+            self.metrics = Metrics()
+
+        @timed('errand', 'shop')
+        def shop(self):
+            return 'sold'
+
+    player = Player()
+    assert player.shop() == 'sold'
+    with player.metrics.timer('route', 'path'):
+        pass
+    assert set(player.metrics.histograms) == {('errand', 'shop'), ('route', 'path')}
+    assert 'shop' in player.metrics.summary()
+    assert 'gameplayer_seconds_count{category="errand",name="shop"} 1' in player.metrics.to_prometheus()
+
+
+def test_maybe_report_logs_summary():
+    stream = io.StringIO()
+    log = EventLog(stream=stream)
+    metrics = Metrics(report_every=0)
+    metrics.observe('request', 'adv/move', .2)
+    metrics.maybe_report(log)
+    log.flush()
+    assert 'adv/move' in stream.getvalue()
+    metrics.report_every = 600
+    metrics.maybe_report(log)
+    log.flush()
+    assert stream.getvalue().count('adv/move') == 1
+
+
+def test_save_picks_format_by_extension(tmp_path):
+    metrics = Metrics(report_every=0, path=str(tmp_path / 'metrics.prom'))
+    metrics.observe('request', 'adv/move', .2)
+    metrics.maybe_report(EventLog(stream=io.StringIO()))
+    with open(metrics.path) as f:
+        assert 'gameplayer_seconds_count{category="request",name="adv/move"} 1' in f.read()
+    metrics.path = str(tmp_path / 'metrics.json')
+    metrics.save()
+    with open(metrics.path) as f:
+        assert json.load(f)[0]['name'] == 'adv/move'
+    # Without a path there's nothing to write.
+    Metrics().save()
+
+
+def test_auto_play_saves_metrics_on_exit(world_dir):
+    server = serve(seed=1, compression=2000)
+    server.game.sim_limit = 300
+    game = GamePlayer(url=server.url, session=None, metrics='metrics.json')
+    game.cooldown_margin /= server.game.compression
+    try:
+        # The player stops on the first refused request, once out of simulated time.
+        with pytest.raises(KeyError):
+            game.auto_play()
+    finally:
+        server.shutdown()
+        server.server_close()
+    with open('metrics.json') as f:
+        names = {(row['category'], row['name']) for row in json.load(f)}
+    assert ('request', 'adv/init') in names
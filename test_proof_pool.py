@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+
+from play_it import GamePlayer
+from proof_pool import is_proof, search, serve, solve_proof, work
+
+
+@pytest.fixture
+def pool(tmp_path):
+    """A coordinator on a Unix socket handing out small ranges. Its worker connections are closed afterwards."""
+    address = str(tmp_path / 'proofs.sock')
+    server = serve(address, chunk=2000)
+    yield address, server
+    server.shutdown()
+    server.server_close()
+    for worker in list(server.coordinator.workers):
+        worker.close()
+
+
+def start_worker(address: str) -> None:
+    threading.Thread(target=work, args=(address,), daemon=True).start()
+
+
+def test_search():
+    proof = search(12345, 3, 0, 100000)
+    assert is_proof(12345, proof, 3)
+    assert not any(is_proof(12345, x, 3) for x in range(proof))
+    assert search(12345, 3, 0, 100000, cancelled=lambda: True) is None
+
+
+def test_workers_share_a_job(pool):
+    address, server = pool
+    for _ in range(2):
+        start_worker(address)
+    proof = solve_proof(address, 777, 4)
+    assert is_proof(777, proof, 4)
+    # A later ask for the same job is answered from the solved jobs.
+    assert solve_proof(address, 777, 4, timeout=0) == proof
+    assert server.coordinator.ranges >= 1
+
+
+def test_no_workers_answers_right_away(pool):
+    address, _ = pool
+    start = time.monotonic()
+    assert solve_proof(address, 777, 4) is None
+    assert time.monotonic() - start < 1
+
+
+def test_times_out(pool):
+    address, _ = pool
+    start_worker(address)
+    time.sleep(.2)
+    assert solve_proof(address, 777, 64, timeout=.2) is None
+    assert not pool[1].coordinator.jobs
+
+
+def test_abandoned_job_does_not_block_newer_ones(pool):
+    address, _ = pool
+    start_worker(address)
+    time.sleep(.2)
+    assert solve_proof(address, 777, 64, timeout=.2) is None
+    proof = solve_proof(address, 778, 4, timeout=5)
+    assert is_proof(778, proof, 4)
+
+
+def test_player_falls_back_to_searching_alone(world_dir):
+    game = GamePlayer(session=None, proof_pool=str(world_dir / 'missing.sock'))
+    assert game.find_proof(777, 3) == search(777, 3, 0, 100000)
@@ -0,0 +1,63 @@
+import json
+import threading
+
+import pytest
+
+from local_server import serve
+from play_it import GamePlayer
+from recording import Recorder, ReplayExhausted, ReplayMismatch, Replayer
+
+
+def test_replay_round_trip(world_dir):
+    server = serve(seed=1, compression=2000)
+    server.game.sim_limit = 900
+    game = GamePlayer(url=server.url, record='session.jsonl', seed=1)
+    game.cooldown_margin /= server.game.compression
+
+    def play() -> None:
+        # The player stops on the first refused request, once out of simulated time.
+        with pytest.raises(KeyError):
+            game.auto_play()
+
+    thread = threading.Thread(target=play, daemon=True)
+    thread.start()
+    thread.join(60)
+    server.shutdown()
+    server.server_close()
+    game.recorder.close()
+    assert not thread.is_alive()
+    with open('session.jsonl') as f:
+        recorded = sum(1 for _ in f)
+    assert recorded > 10
+
+    # Strict by default, so any request that differs from the recording raises ReplayMismatch.
+    replay = GamePlayer(replay='session.jsonl', seed=1)
+    with pytest.raises((KeyError, ReplayExhausted)):
+        replay.auto_play()
+    assert replay.replayer.index == recorded
+    assert replay.replayer.divergences == []
+    # Neither run read or wrote the default session.
+    assert not (world_dir / 'player.pickle').exists()
+
+
+def test_replayer_checks_requests(tmp_path):
+    path = str(tmp_path / 'session.jsonl')
+    recorder = Recorder(path)
+    recorder.write('post', 'api/adv/move/', {'direction': 'n'}, {'room_id': 10, 'cooldown': 15.0}, 0, .1)
+    recorder.write('get', 'api/adv/init/', None, {'room_id': 10, 'cooldown': 1.0}, 1, .1)
+    recorder.close()
+
+    replayer = Replayer(path)
+    assert replayer.next('post', 'api/adv/move/', {'direction': 'n'})['room_id'] == 10
+    with pytest.raises(ReplayMismatch):
+        replayer.next('post', 'api/adv/move/', {'direction': 's'})
+
+    replayer = Replayer(path, strict=False)
+    replayer.next('post', 'api/adv/move/', {'direction': 's'})
+    replayer.next('get', 'api/adv/init/', None)
+    assert [divergence['index'] for divergence in replayer.divergences] == [0]
+    assert replayer.report()['recorded_cooldown'] == 16.0
+    with pytest.raises(ReplayExhausted):
+        replayer.next('get', 'api/adv/init/', None)
+    with open(path) as f:
+        assert json.loads(f.readline())['cooldown'] == 15.0
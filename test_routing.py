@@ -0,0 +1,107 @@
+import random
+
+import pytest
+
+from conftest import player_at
+from routing import INFINITY, NoRoute, RouteIndex
+
+
+def random_graph(rng: random.Random, rooms: int = 60) -> dict:
+    """{room: {direction: (next room, cost)}}, with some rooms not yet reachable."""
+    graph = {room: {} for room in range(rooms)}
+    for room in range(rooms):
+        for direction in rng.sample('nsewx', rng.randint(0, 3)):
+            graph[room][direction] = (rng.randrange(rooms), rng.choice((1, 1, 2, 5)))
+    return graph
+
+
+def edges_of(graph: dict):
+    return lambda room: ((next_room, direction, cost) for direction, (next_room, cost) in graph[room].items())
+
+
+def test_routes_stay_shortest_while_the_map_changes():
+    rng = random.Random(4)
+    graph = random_graph(rng)
+    # Every route is checked against a fresh search, and a wrong one raises RouteMismatch.
+    routes = RouteIndex(edges_of(graph), max_targets=4, validate=1)
+    routes.sync(graph)
+    for _ in range(300):
+        room = rng.randrange(len(graph))
+        if graph[room] and rng.random() < .5:
+            del graph[room][rng.choice(list(graph[room]))]
+        else:
+            graph[room][rng.choice('nsewx')] = (rng.randrange(len(graph)), rng.choice((1, 2, 5)))
+        routes.sync([room])
+        for _ in range(5):
+            start, target = rng.randrange(len(graph)), rng.choice((0, 1, 2, rng.randrange(len(graph))))
+            path = routes.path(start, target)
+            if path is None:
+                assert routes.search(start, target) == INFINITY
+            else:
+                room = start
+                for next_room, direction in path:
+                    assert graph[room][direction][0] == next_room
+                    room = next_room
+                assert room == target
+    assert routes.queries == 1500
+
+
+def test_trees_kept_from_the_second_route():
+    graph = {room: {'n': ((room + 1) % 20, 1)} for room in range(20)}
+    routes = RouteIndex(edges_of(graph), max_targets=2)
+    routes.sync(graph)
+    routes.path(0, 5)
+    assert not routes.trees
+    routes.path(1, 5)
+    assert list(routes.trees) == [5]
+    for target in (6, 6, 7, 7):
+        routes.path(0, target)
+    # Only the two most recently used trees are kept.
+    assert list(routes.trees) == [6, 7]
+    assert routes.path(4, 7) == [(5, 'n'), (6, 'n'), (7, 'n')]
+
+
+def test_lenient_check_rebuilds_a_stale_tree():
+    graph = {0: {'n': (1, 1)}, 1: {'n': (2, 1)}, 2: {}}
+    routes = RouteIndex(edges_of(graph), validate=1, strict=False)
+    routes.sync(graph)
+    routes.path(0, 2)
+    routes.path(0, 2)
+    # Change the map without syncing the index.
+    graph[0]['e'] = (2, 1)
+    routes.path(0, 2)
+    assert routes.mismatches == [{'start': 0, 'target': 2, 'expected': 1, 'actual': 2}]
+    assert 2 not in routes.trees
+
+
+@pytest.mark.parametrize('dash', [False, True])
+def test_player_warps_along_a_route(server, dash, monkeypatch):
+    game = player_at(server, 0)
+    game.dash_ = dash
+    taken = []
+    monkeypatch.setattr(game, 'take', taken.append)
+    # Through the alternate dimension and back.
+    path = game.find_path(186)
+    assert [direction for _, direction in path].count('warp') == 2
+    # Leave something on the way, in the alternate dimension.
+    passed = next(room for room, direction in path if room >= 500 and direction != 'warp')
+    server.game.items[passed].append('golden snitch')
+    game.go_to(186)
+    assert game.current_room == server.game.players[game.key].room == 186
+    assert not game.warped
+    # Rooms we only pass through in the alternate dimension aren't searched.
+    assert taken == []
+    game.go_to(555)
+    assert game.current_room == server.game.players[game.key].room == 555
+    assert game.warped
+
+
+def test_no_route_stays_put(server):
+    game = player_at(server, 4)
+    game.warp_ = False
+    # Room 13 is the only way to room 15.
+    game.world[4]['to_e'] = game.world[15]['to_w'] = None
+    with pytest.raises(NoRoute):
+        game.find_path(15)
+    game.go_to(15)
+    assert game.current_room == 4
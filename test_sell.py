@@ -0,0 +1,58 @@
+import pytest
+
+from local_server import serve
+from play_it import GamePlayer
+
+
+def treasure(name: str, weight: int) -> dict:
+    return {'name': name, 'itemtype': 'TREASURE', 'weight': weight}
+
+
+@pytest.fixture
+def shop(world_dir):
+    """A player in the shop of a local server, carrying two tiny treasures and a small one."""
+    server = serve(seed=1, compression=2000)
+    game = GamePlayer(url=server.url, session=None)
+    game.cooldown_margin /= server.game.compression
+    player = server.game.player(game.key)
+    player.room = 1
+    player.inventory = ['tiny treasure', 'tiny treasure', 'small treasure']
+    game.items_.extend([treasure('tiny treasure', 1), treasure('tiny treasure', 1), treasure('small treasure', 2)])
+    yield game, player
+    server.shutdown()
+    server.server_close()
+
+
+def test_known_prices_skip_the_quote(shop):
+    game, player = shop
+    game.sell()
+    # Quote and confirm for each new name, confirm only for the second tiny treasure, then status.
+    assert player.requests == 6
+    assert player.gold == 400
+    assert not game.items_
+    assert game.prices['tiny treasure'] == {'itemtype': 'TREASURE', 'weight': 1, 'price': 100}
+    assert game.prices['small treasure']['price'] == 200
+
+
+def test_unsold_treasure_is_still_carried(shop):
+    game, player = shop
+    game.prices['tiny treasure'] = {'itemtype': 'TREASURE', 'weight': 1, 'price': 100}
+    # Out of the shop, every sale fails.
+    player.room = 0
+    game.sell()
+    assert [item['name'] for item in game.items_] == ['tiny treasure', 'tiny treasure', 'small treasure']
+    assert 'tiny treasure' not in game.prices
+    assert player.gold == 0
+
+
+def test_record_price_and_item_value():
+    game = GamePlayer(session=None)
+    assert game.item_value(treasure('tiny treasure', 1)) is None
+    game.record_price(treasure('tiny treasure', 1), {'messages': ["I'll give you 100 gold for that Tiny Treasure."]})
+    game.record_price(treasure('great treasure', 3), {'messages': ['You have received 500 gold.']})
+    game.record_price(treasure('odd treasure', 1), {'messages': ['No deal.']})
+    assert set(game.prices) == {'tiny treasure', 'great treasure'}
+    assert game.item_value(treasure('tiny treasure', 1)) == 100
+    # Unpriced treasure is worth its weight at the average gold per weight of what's been priced.
+    assert game.item_value(treasure('shiny treasure', 2)) == 2 * 600 / 4
+    assert game.item_value({'name': 'nice boots', 'itemtype': 'FOOTWEAR', 'weight': 1}) is None
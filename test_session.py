@@ -0,0 +1,32 @@
+from local_server import serve
+from play_it import GamePlayer
+
+
+def test_resume_with_one_request(world_dir):
+    server = serve(seed=1, compression=2000)
+    game = GamePlayer(url=server.url)
+    game.cooldown_margin /= server.game.compression
+    game.load_map()
+    game.initialize_player()
+    game.gold = 1234
+    game.save_session()
+    player = server.game.players[game.key]
+    requests = player.requests
+
+    resumed = GamePlayer(url=server.url)
+    assert resumed.load_session()
+    assert player.requests == requests + 1
+    assert (resumed.current_room, resumed.gold, resumed.strength) == (game.current_room, 1234, game.strength)
+    # Another player's session isn't resumed.
+    resumed.key = 'someone else'
+    assert not resumed.load_session()
+    server.shutdown()
+    server.server_close()
+
+
+def test_no_session_when_recording(world_dir):
+    game = GamePlayer(record='session.jsonl')
+    game.save_session()
+    game.recorder.close()
+    assert game.session is None
+    assert not (world_dir / 'player.pickle').exists()
@@ -0,0 +1,102 @@
+import os
+import pickle
+
+import pytest
+
+from conftest import HERE
+from local_server import serve
+from play_it import GamePlayer
+from shared_map import SharedWorld
+
+
+@pytest.fixture
+def world():
+    with open(os.path.join(HERE, 'world.pickle'), 'rb') as f:
+        return pickle.load(f)
+
+
+@pytest.fixture
+def path(tmp_path, world):
+    path = str(tmp_path / 'world.map')
+    SharedWorld.create(path, world).close()
+    return path
+
+
+def test_matches_pickled_world(path, world):
+    shared = SharedWorld(path)
+    assert set(shared) == set(world)
+    for room in (0, 1, 55, 555):
+        for direction in 'nsew':
+            assert shared[room][f'to_{direction}'] == world[room][f'to_{direction}']
+        assert sorted(shared[room]['meta']['exits']) == sorted(world[room]['meta']['exits'])
+    assert 5000 not in shared and 'room' not in shared
+    shared.close()
+
+
+def test_readers_see_writes(path):
+    writer = SharedWorld(path, writable=True)
+    reader = SharedWorld(path)
+    version = reader.version
+    writer[0]['to_n'] = 555
+    assert reader[0]['to_n'] == 555
+    assert reader.version == version + 1
+    writer.close()
+    reader.close()
+
+
+def test_one_writer_at_a_time(path):
+    writer = SharedWorld(path, writable=True)
+    reader = SharedWorld(path)
+    with pytest.raises(PermissionError):
+        SharedWorld(path, writable=True)
+    with pytest.raises(PermissionError):
+        reader[0]['to_n'] = 555
+    # Once the writer exits, the next player to write takes over.
+    writer.close()
+    reader[0]['to_n'] = 555
+    assert reader.writable
+    reader.close()
+    again = SharedWorld(path)
+    assert again[0]['to_n'] == 555
+    again.close()
+
+
+def test_player_claims_the_writer_role(world_dir, path):
+    first, second = GamePlayer(session=None, shared_map=path), GamePlayer(session=None, shared_map=path)
+    first.load_map()
+    second.load_map()
+    assert first.world.writable and not second.world.writable
+    assert len(second.world) == len(first.world) > 0
+    first.world.close()
+    second.world.close()
+
+
+def test_missing_map_is_published(world_dir, world):
+    game = GamePlayer(session=None, shared_map='world.map')
+    game.load_map()
+    assert game.world.writable
+    assert len(game.world) == len(world)
+    game.world.close()
+
+
+def test_discovered_rooms_are_shared(world_dir, world):
+    # Room 13 is the only way to room 15. Leave it off the map.
+    del world[13]
+    world[4]['to_e'] = world[15]['to_w'] = None
+    SharedWorld.create('world.map', world).close()
+    server = serve(seed=1, compression=2000)
+    explorer, reader = (GamePlayer(url=server.url, session=None, shared_map='world.map') for _ in range(2))
+    explorer.cooldown_margin /= server.game.compression
+    for game in (explorer, reader):
+        game.load_map()
+        # Keep routes in this dimension.
+        game.warp_ = False
+    server.game.player(explorer.key).room = explorer.current_room = 4
+    explorer.DFS_DE()
+    assert explorer.current_room == 15
+    assert reader.find_path(15, start=4) == [(13, 'e'), (15, 'e')]
+    assert reader.find_path(4, start=15) == [(13, 'w'), (4, 'w')]
+    server.shutdown()
+    server.server_close()
+    explorer.world.close()
+    reader.world.close()
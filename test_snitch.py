@@ -0,0 +1,31 @@
+import pytest
+
+from conftest import player_at
+
+
+@pytest.mark.parametrize('dash', [False, True])
+def test_snitch_run(server, dash, monkeypatch):
+    game = player_at(server, 0)
+    game.dash_ = dash
+    looked = []
+    monkeypatch.setattr(game, 'find_items', looked.append)
+    # Taking the snitch moves it on.
+    snitch_room = server.game.snitch_room
+    game.dimensional_traveler()
+    assert game.current_room == snitch_room
+    assert server.game.players[game.key].snitches == 1
+    assert game.metrics.histograms['snitch', 'wish_to_snitch'].count == 1
+    # Nothing looks around between the wish and the snitch.
+    assert looked == []
+
+
+def test_coin_dash(server, monkeypatch):
+    game = player_at(server, 0)
+    looked = []
+    monkeypatch.setattr(game, 'find_items', looked.append)
+    mine_room = server.game.mine_room
+    game.coin_dash()
+    assert game.current_room == game.places['mine']['room_id'] == mine_room
+    assert game.metrics.histograms['errand', 'wish_to_mine'].count == 1
+    assert server.game.players[game.key].coins == 1
+    assert looked == []
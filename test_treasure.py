@@ -0,0 +1,56 @@
+import pytest
+
+from play_it import GamePlayer
+
+
+def treasure(name: str, weight: int) -> dict:
+    return {'name': name, 'itemtype': 'TREASURE', 'weight': weight}
+
+
+@pytest.fixture
+def game(world_dir, monkeypatch):
+    """A player whose requests are only logged, carrying a small treasure with strength for one more."""
+    game = GamePlayer(session=None)
+    game.requests = []
+    monkeypatch.setattr(game, 'make_request', lambda suffix, data=None, **kwargs: game.requests.append(
+        (suffix.strip('/').split('/')[-1], data['name'])) or {})
+    monkeypatch.setattr(game, 'status', lambda: None)
+    game.prices = {'small treasure': {'itemtype': 'TREASURE', 'weight': 2, 'price': 200}}
+    game.items_.append(treasure('small treasure', 2))
+    game.strength, game.encumbrance = 3, 2
+    return game
+
+
+def test_knapsack():
+    assert GamePlayer.knapsack([2, 3, 4], [3, 4, 5], 5) == {0, 1}
+    assert GamePlayer.knapsack([2, 3, 4], [3, 4, 5], 0) == set()
+
+
+def test_small_gain_is_not_worth_a_swap(game):
+    game.prices['great treasure'] = {'itemtype': 'TREASURE', 'weight': 2, 'price': 210}
+    game.pick_treasure([treasure('great treasure', 2)])
+    assert game.requests == []
+
+
+def test_large_gain_swaps(game):
+    game.prices['great treasure'] = {'itemtype': 'TREASURE', 'weight': 2, 'price': 1000}
+    game.pick_treasure([treasure('great treasure', 2)])
+    assert game.requests == [('drop', 'small treasure'), ('take', 'great treasure')]
+    assert game.encumbrance == 2
+    assert [item['name'] for item in game.items_] == ['great treasure']
+
+
+def test_no_capacity_keeps_what_we_carry(game):
+    # Heavy boots fill what's left of our strength.
+    game.encumbrance += 5
+    game.pick_treasure([treasure('small treasure', 2)])
+    assert game.requests == []
+    assert len(game.items_) == 1
+
+
+def test_takes_what_fits_beside(game):
+    game.strength = 6
+    game.pick_treasure([treasure('small treasure', 2), treasure('tiny treasure', 1), treasure('small treasure', 2)])
+    # Unpriced treasure is valued at the gold per weight of what we've sold.
+    assert game.requests == [('take', 'small treasure'), ('take', 'tiny treasure')]
+    assert game.encumbrance == 5